@@ -0,0 +1,258 @@
+"""Asyncio HTTP service serving customer scores, score components and profiles to programmatic clients.
+
+Clients authenticate with an API key mapped to subscribers (auth.api_keys), and
+see each customer only through RowLevelSecurity on those subscribers, exactly
+like a user of the app. Lookups arriving in the same event-loop tick are
+coalesced per customer and scored together in one vectorized pass; results
+are kept in an in-process cache keyed by store version and scoring date.
+
+Endpoints (GET, with an X-API-Key or "Authorization: Bearer" header):
+    /v1/customers/<customer_id>/score
+    /v1/customers/<customer_id>/components
+    /v1/customers/<customer_id>/profile
+    /health
+"""
+import asyncio
+import json
+import sys
+from datetime import date, datetime
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from auth.api_keys import ApiClient, ApiKeyDatabase
+from auth.permissions import RowLevelSecurity
+from models.cache import LRUCache
+from models.scorecard import get_scorecard
+from models.scoring import score_breakdown, score_portfolio
+from models.store import SharedStore, get_channel
+
+# Account columns returned by the profile endpoint, where present in the store
+PROFILE_COLUMNS = ['account_number', 'product_type', 'subscriber_id', 'current_status', 'opening_date',
+                   'last_payment_date', 'credit_limit', 'current_balance', 'balance_overdue',
+                   'monthly_instalment']
+# Seconds between checks for a new store version or changed API keys
+POLL_INTERVAL = 1.0
+
+_MISSING = object()
+
+
+def _json_value(value):
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _customer_result(customer_id: str, accounts: List[Dict], scores: Dict, today: date) -> Dict:
+    """Everything the endpoints return about one customer, as JSON-ready values"""
+    scorecard = get_scorecard()
+    total, components = score_breakdown(scores, scorecard)
+    payment_dates = [account['last_payment_date'] for account in accounts if account.get('last_payment_date')]
+    return {
+        'customer_id': customer_id,
+        'as_of': today.isoformat(),
+        'scorecard': scorecard.version,
+        'score': total,
+        'max_score': scorecard.max_score,
+        'category': scores['category'],
+        'components': components,
+        'profile': {
+            'accounts': accounts,
+            'total_credit_limit': float(scores['total_credit_limit']),
+            'total_current_balance': float(scores['total_current_balance']),
+            'total_overdue': float(scores['total_overdue']),
+            'utilization': float(scores['utilization']),
+            'overdue_ratio': float(scores['overdue_ratio']),
+            'active_products': int(scores['active_products']),
+            'product_types': sorted({account['product_type'] for account in accounts if account['product_type']}),
+            'subscriber_ids': sorted({account['subscriber_id'] for account in accounts if account['subscriber_id']}),
+            'avg_days_since_payment': float(scores['avg_days_since_payment']),
+            'last_payment_date': max(payment_dates) if payment_dates else None,
+        },
+    }
+
+
+ENDPOINTS = {
+    'score': lambda result: {key: result[key] for key in
+                             ('customer_id', 'as_of', 'scorecard', 'score', 'max_score', 'category')},
+    'components': lambda result: {key: result[key] for key in
+                                  ('customer_id', 'as_of', 'scorecard', 'score', 'max_score', 'components')},
+    'profile': lambda result: {key: result[key] for key in ('customer_id', 'as_of', 'profile')},
+}
+
+
+class ScoringService:
+    """Scores customers of the shared store on demand, one batch per event-loop tick"""
+
+    def __init__(self, store: Optional[SharedStore] = None, keys: Optional[ApiKeyDatabase] = None,
+                 cache_size: int = 65536):
+        self.store = store or SharedStore()
+        self.keys = keys or ApiKeyDatabase()
+        self.cache = LRUCache(maxsize=cache_size)
+        self._index: Optional[Tuple[int, pd.DataFrame, Dict]] = None
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self._batch: List[Tuple] = []
+        self.batches = 0
+
+    def refresh(self):
+        """Reload the store after another process published a new version"""
+        version = self.store.version()
+        if self._index is None or self._index[0] != version:
+            data, version = self.store.load()
+            positions = data.groupby('customer_id', sort=False).indices
+            self._index = (version, data, positions)
+
+    async def poll(self):
+        """Pick up new store versions and API key changes for as long as the service runs"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            get_channel().poll()
+            await loop.run_in_executor(None, self.refresh)
+
+    async def customer(self, client: ApiClient, customer_id: str) -> Optional[Dict]:
+        """Scored customer as the client's subscribers see it, None when they see none of its rows"""
+        scope = tuple(sorted(client.subscriber_ids))
+        key = (customer_id, scope, self._index[0], datetime.now().date())
+        result = self.cache.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._in_flight[key] = future
+            self._batch.append(key)
+            if len(self._batch) == 1:
+                loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        """Score every lookup queued during the last tick, one vectorized pass per subscriber scope"""
+        batch, self._batch = self._batch, []
+        self.batches += 1
+        groups: Dict[Tuple, List[str]] = {}
+        for customer_id, scope, version, today in batch:
+            groups.setdefault((scope, version, today), []).append(customer_id)
+        for (scope, version, today), customer_ids in groups.items():
+            try:
+                results, failure = self._score(customer_ids, scope, today), None
+            except Exception as error:
+                results, failure = {}, error
+            for customer_id in customer_ids:
+                key = (customer_id, scope, version, today)
+                future = self._in_flight.pop(key)
+                if failure is not None:
+                    future.set_exception(failure)
+                    continue
+                result = results.get(customer_id)
+                self.cache.put(key, result)
+                future.set_result(result)
+
+    def _score(self, customer_ids: List[str], scope: Tuple, today: date) -> Dict[str, Dict]:
+        _, data, positions = self._index
+        found = [positions[customer_id] for customer_id in customer_ids if customer_id in positions]
+        if not found:
+            return {}
+        rows = data.iloc[np.concatenate(found)]
+        rows = RowLevelSecurity.filter_data_by_subscriber(rows, list(scope))
+        if rows.empty:
+            return {}
+        scores = score_portfolio(rows, today=today).to_dict('index')
+
+        # Plain Python records built column by column; pandas per customer would dominate the batch
+        columns = [column for column in PROFILE_COLUMNS if column in rows.columns]
+        values = [[_json_value(value) for value in rows[column].tolist()] for column in columns]
+        accounts: Dict[str, List[Dict]] = {}
+        for customer_id, row in zip(rows['customer_id'].tolist(), zip(*values)):
+            accounts.setdefault(customer_id, []).append(dict(zip(columns, row)))
+        return {customer_id: _customer_result(customer_id, accounts[customer_id], customer_scores, today)
+                for customer_id, customer_scores in scores.items()}
+
+    async def route(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, Dict]:
+        path = urlsplit(target).path.rstrip('/')
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Only GET is supported"}
+        if path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'store_version': self._index[0]}
+
+        authorization = headers.get('authorization', '')
+        api_key = headers.get('x-api-key') or (authorization[7:] if authorization.startswith('Bearer ') else '')
+        client = self.keys.authenticate(api_key)
+        if client is None:
+            return HTTPStatus.UNAUTHORIZED, {'error': "Missing or invalid API key"}
+
+        parts = path.split('/')
+        if len(parts) != 5 or parts[1:3] != ['v1', 'customers'] or parts[4] not in ENDPOINTS:
+            return HTTPStatus.NOT_FOUND, {'error': "Unknown endpoint"}
+        result = await self.customer(client, unquote(parts[3]))
+        if result is None:
+            return HTTPStatus.NOT_FOUND, {'error': "Customer not found"}
+        return HTTPStatus.OK, ENDPOINTS[parts[4]](result)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one connection, with HTTP/1.1 keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                try:
+                    method, target, protocol = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, {'error': "Malformed request"}, False))
+                    break
+                keep_alive = protocol == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    status, body = await self.route(method, target, headers)
+                except Exception as error:
+                    print(f"Error serving {target}: {error!r}", file=sys.stderr)
+                    status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal error"}
+                writer.write(_response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away, or sent an oversized or unreadable request
+        finally:
+            writer.close()
+
+
+def _response(status: HTTPStatus, body: Dict, keep_alive: bool) -> bytes:
+    payload = json.dumps(body, separators=(',', ':')).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + payload
+
+
+async def serve(service: ScoringService, host: str = '127.0.0.1', port: int = 8080):
+    """Run the service until cancelled"""
+    service.refresh()
+    server = await asyncio.start_server(service.handle, host, port, backlog=1024)
+    poller = asyncio.create_task(service.poll())
+    print(f"Scoring service listening on http://{host}:{port}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        poller.cancel()
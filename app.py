@@ -4,7 +4,7 @@ from components.sidebar import render_sidebar
 from components.customer_view import render_customer_view, render_welcome_screen
 from components.data_manager import CreditProfileManager
 from auth.authentication import AuthenticationManager
-from auth.permissions import RowLevelSecurity
+from models.store import get_channel
 
 
 def load_css(file_name):
@@ -27,6 +27,9 @@ def main():
     # Apply custom styles
     # apply_custom_styles()
     
+    # Drop local caches invalidated by other replicas
+    get_channel().poll()
+    
     # Initialize authentication manager
     auth_manager = AuthenticationManager()
     
@@ -51,10 +54,7 @@ def _render_authenticated_app(auth_manager):
     # Filter data based on user permissions
     if not is_admin and 'subscriber_id' in st.session_state.data.columns:
         original_count = len(st.session_state.data)
-        st.session_state.data = RowLevelSecurity.filter_data_by_subscriber(
-            st.session_state.data, 
-            user_subscriber_ids
-        )
+        manager.apply_row_level_security(user_subscriber_ids)
         filtered_count = len(st.session_state.data)
         
         # Show access info (only show once per session)
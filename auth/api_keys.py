@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from models.store import atomic_write, file_lock, get_channel
+
+# Clients parsed once per process and dropped when any replica writes the key file
+_clients_cache: Dict[str, Dict[str, 'ApiClient']] = {}
+_clients_cache_lock = threading.Lock()
+
+def _drop_clients_cache(namespace: str):
+    with _clients_cache_lock:
+        _clients_cache.clear()
+
+get_channel().subscribe('api_keys', _drop_clients_cache)
+
+class ApiClient:
+    """Programmatic client of the scoring service, scoped to subscribers like a user"""
+    def __init__(self, name: str, key_hash: str, subscriber_ids: List[str]):
+        self.name = name
+        self.key_hash = key_hash
+        self.subscriber_ids = subscriber_ids  # List of subscriber IDs the client can access
+        self.created_at = datetime.now()
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'key_hash': self.key_hash,
+            'subscriber_ids': self.subscriber_ids,
+            'created_at': self.created_at.isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        client = cls(
+            name=data['name'],
+            key_hash=data['key_hash'],
+            subscriber_ids=data['subscriber_ids']
+        )
+        if 'created_at' in data:
+            client.created_at = datetime.fromisoformat(data['created_at'])
+        return client
+
+class ApiKeyDatabase:
+    """API keys stored hashed in a JSON file, mapping each key to its client's subscribers"""
+    def __init__(self, db_path: str = "api_keys.json"):
+        self.db_path = db_path
+        self.clients = self._load_clients()
+
+    def _load_clients(self) -> Dict[str, ApiClient]:
+        """Load clients, keyed by key hash, from the process cache or the JSON file"""
+        with _clients_cache_lock:
+            cached = _clients_cache.get(self.db_path)
+        if cached is not None:
+            return cached
+        clients = {}
+        if os.path.exists(self.db_path):
+            with open(self.db_path, 'r') as f:
+                clients = {data['key_hash']: ApiClient.from_dict(data) for data in json.load(f).values()}
+        with _clients_cache_lock:
+            _clients_cache[self.db_path] = clients
+        return clients
+
+    @staticmethod
+    def _hash_key(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    def authenticate(self, api_key: str) -> Optional[ApiClient]:
+        """Client owning api_key, or None"""
+        if not api_key:
+            return None
+        return self._load_clients().get(self._hash_key(api_key))
+
+    def create_key(self, name: str, subscriber_ids: List[str]) -> str:
+        """Register a client and return its key; only the hash is stored, so the key is shown once"""
+        api_key = secrets.token_urlsafe(32)
+        client = ApiClient(name, self._hash_key(api_key), list(subscriber_ids))
+        self._modify(lambda clients: clients.__setitem__(name, client.to_dict()))
+        return api_key
+
+    def revoke(self, name: str) -> bool:
+        """Remove a client's key"""
+        removed = []
+        self._modify(lambda clients: removed.append(clients.pop(name, None)))
+        return removed[0] is not None
+
+    def _modify(self, change):
+        """Apply change to the on-disk clients, keyed by name, so replicas never overwrite each other"""
+        with file_lock(self.db_path + '.lock'):
+            clients = {}
+            if os.path.exists(self.db_path):
+                with open(self.db_path, 'r') as f:
+                    clients = json.load(f)
+            change(clients)
+            atomic_write(self.db_path, lambda f: json.dump(clients, f, indent=2))
+        get_channel().publish(['api_keys'])
+        with _clients_cache_lock:
+            _clients_cache.pop(self.db_path, None)
+        self.clients = self._load_clients()
@@ -1,8 +1,20 @@
 import hashlib
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from models.store import atomic_write, file_lock, get_channel
+
+# Users parsed once per process and dropped when any replica writes users.json
+_users_cache: Dict[str, Dict[str, 'User']] = {}
+_users_cache_lock = threading.Lock()
+
+def _drop_users_cache(namespace: str):
+    with _users_cache_lock:
+        _users_cache.clear()
+
+get_channel().subscribe('users', _drop_users_cache)
 
 class User:
     """User class representing an authenticated user"""
@@ -52,7 +64,20 @@ class UserDatabase:
         self.users = self._load_users()
         
     def _load_users(self) -> Dict[str, User]:
-        """Load users from JSON file"""
+        """Load users from the process cache, falling back to the JSON file"""
+        with _users_cache_lock:
+            cached = _users_cache.get(self.db_path)
+        if cached is not None:
+            return dict(cached)
+        users = self._read_users()
+        if users is None:
+            users = self._create_default_users()
+        with _users_cache_lock:
+            _users_cache[self.db_path] = dict(users)
+        return users
+    
+    def _read_users(self) -> Optional[Dict[str, User]]:
+        """Read users from JSON file"""
         if os.path.exists(self.db_path):
             try:
                 with open(self.db_path, 'r') as f:
@@ -61,7 +86,19 @@ class UserDatabase:
                            for username, user_data in data.items()}
             except:
                 pass
-        return self._create_default_users()
+        return None
+    
+    def _modify_users(self, change: Callable[[Dict[str, User]], None]):
+        """Apply change to the latest on-disk users so replicas never overwrite each other"""
+        with file_lock(self.db_path + '.lock'):
+            latest = self._read_users()
+            if latest is not None:
+                self.users = latest
+            change(self.users)
+            self._save_users(self.users)
+        get_channel().publish(['users'])
+        with _users_cache_lock:
+            _users_cache[self.db_path] = dict(self.users)
     
     def _create_default_users(self) -> Dict[str, User]:
         """Create default users if no database exists"""
@@ -108,7 +145,9 @@ class UserDatabase:
             ),
 
         }
-        self._save_users(default_users)
+        with file_lock(self.db_path + '.lock'):
+            self._save_users(default_users)
+        get_channel().publish(['users'])
         return default_users
     
     def _hash_password(self, password: str) -> str:
@@ -118,16 +157,18 @@ class UserDatabase:
     def _save_users(self, users: Dict[str, User]):
         """Save users to JSON file"""
         data = {username: user.to_dict() for username, user in users.items()}
-        with open(self.db_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        atomic_write(self.db_path, lambda f: json.dump(data, f, indent=2, default=str))
     
     def authenticate(self, username: str, password: str) -> Optional[User]:
         """Authenticate user with username and password"""
         user = self.users.get(username)
         if user and user.password_hash == self._hash_password(password):
-            user.last_login = datetime.now()
-            self._save_users(self.users)
-            return user
+            last_login = datetime.now()
+            def record_login(users):
+                if username in users:
+                    users[username].last_login = last_login
+            self._modify_users(record_login)
+            return self.users.get(username, user)
         return None
     
     def get_user(self, username: str) -> Optional[User]:
@@ -136,23 +177,26 @@ class UserDatabase:
     
     def add_user(self, user: User):
         """Add new user"""
-        self.users[user.username] = user
-        self._save_users(self.users)
+        def add(users):
+            users[user.username] = user
+        self._modify_users(add)
     
     def update_user(self, username: str, **kwargs):
         """Update user properties"""
-        if username in self.users:
-            user = self.users[username]
-            for key, value in kwargs.items():
-                if hasattr(user, key):
-                    setattr(user, key, value)
-            self._save_users(self.users)
+        def update(users):
+            if username in users:
+                user = users[username]
+                for key, value in kwargs.items():
+                    if hasattr(user, key):
+                        setattr(user, key, value)
+        self._modify_users(update)
     
     def delete_user(self, username: str):
         """Delete user"""
         if username in self.users and username != 'admin':  # Prevent deleting admin
-            del self.users[username]
-            self._save_users(self.users)
+            def delete(users):
+                users.pop(username, None)
+            self._modify_users(delete)
             return True
         return False
     
@@ -18,6 +18,22 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import time
 
+from models.amortization import AmortizationSchedule
+from models.attribution import account_attribution
+from models.cache import customer_fingerprint, score_cache
+from models.history import ScoreHistory
+from models.planner import solve_target
+from models.projection import project_scores
+from models.recency import payment_recency
+from models.scorecard import get_scorecard
+from models.scoring import customer_features
+from models.sensitivity import FEATURE_LABELS, FEATURE_RANGES, sensitivity_grid
+from models.whatif import WhatIfOverlay
+from components.portfolio_view import render_portfolio_view
+
+# Snapshot history written by rescore.py, shared by every session
+score_history = ScoreHistory()
+
 GLOBAL_COL_STYLE = """
     {
     background: radial-gradient(circle, #164DF2, #0F2A66);
@@ -90,10 +106,14 @@ def render_customer_view(manager, customer_id, auth_manager=None):
     customer_data = manager.get_customer_data(customer_id)
     
     if not customer_data.empty:
-        _render_customer_header(customer_id, len(customer_data))
-        _render_summary_statistics(customer_data)
+        aggregates = manager.get_customer_aggregates(customer_id)
+        _render_customer_header(customer_id, aggregates['rows'])
+        _render_summary_statistics(customer_data, aggregates)
         _render_editable_table(manager, customer_id, customer_data, auth_manager)
-        _render_credit_score_dashboard(customer_data, customer_id, auth_manager)
+        percentiles = manager.get_customer_percentiles(customer_id)
+        _render_credit_score_dashboard(customer_data, customer_id, auth_manager, aggregates, percentiles)
+        _render_balance_outlook(customer_data, customer_id)
+        _render_peer_comparison(manager, customer_id)
     else:
         _render_no_data_view(manager, customer_id, auth_manager)
 
@@ -103,6 +123,98 @@ def render_welcome_screen(manager, auth_manager=None):
     
     _render_available_customers(manager, auth_manager)
     _render_dataset_overview(manager, auth_manager)
+    render_portfolio_view(manager, auth_manager)
+
+def _render_balance_outlook(customer_data, customer_id, months=60):
+    """Render projected balances of the customer's instalment accounts and their payoff dates"""
+    schedule = _get_cached_schedule(customer_data, customer_id, months)
+    
+    st.markdown("---")
+    st.header("📉 Balance Outlook")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        fig = go.Figure()
+        for account in schedule.balances.columns:
+            fig.add_trace(go.Scatter(
+                x=schedule.dates, y=schedule.balances[account],
+                mode='lines', stackgroup='balance', name=account
+            ))
+        fig.add_trace(go.Scatter(
+            x=schedule.dates, y=schedule.utilization(),
+            mode='lines', line=dict(color='red', dash='dash'), name="Utilization (%)", yaxis='y2'
+        ))
+        fig.update_layout(
+            height=350,
+            yaxis=dict(title="Projected balance (R)"),
+            yaxis2=dict(title="Utilization (%)", overlaying='y', side='right', rangemode='tozero'),
+            legend=dict(orientation='h', y=-0.2),
+            margin=dict(t=20, b=40, l=40, r=40)
+        )
+        st.plotly_chart(fig, width='stretch')
+    
+    with col2:
+        payoffs = schedule.accounts[schedule.accounts['monthly_instalment'] > 0]
+        if payoffs.empty:
+            st.info("No active instalment accounts to project")
+        else:
+            table = pd.DataFrame({
+                'Account': payoffs['account_number'],
+                'Rate (p.a.)': (payoffs['annual_rate'] * 100).round(1).astype(str) + '%',
+                'Payments Left': payoffs['payments_left'],
+                'Paid Off': payoffs['payoff_date'].dt.strftime('%Y-%m').fillna("Not at this instalment")
+            })
+            st.dataframe(table, width='stretch', hide_index=True)
+            st.caption("Rates are solved from each loan's opening balance, instalment and term")
+
+def _get_cached_schedule(customer_data, customer_id, months):
+    """Amortization schedule of the customer's accounts, built once per fingerprint and day"""
+    today = datetime.now().date()
+    key = ('schedule', customer_id, customer_fingerprint(customer_data), today, months)
+    schedule = score_cache.get(key)
+    if schedule is None:
+        schedule = AmortizationSchedule(customer_data, months, today)
+        score_cache.put(key, schedule, tag=customer_id)
+    return schedule
+
+def _render_peer_comparison(manager, customer_id, k=20):
+    """Render how the customer's score compares with the most similar customers"""
+    peers = manager.get_customer_peers(customer_id, k)
+    if peers is None or peers.empty:
+        return
+    
+    st.markdown("---")
+    st.header("👥 Peer Comparison")
+    st.caption("Customers with the most similar credit limits, utilization, product mix and account age")
+    
+    current_score = manager.get_customer_percentiles(customer_id)['score']
+    peer_scores = peers['score'].astype(int)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Your Score", current_score)
+    with col2:
+        st.metric("Peer Median", f"{peer_scores.median():.0f}", delta=f"{current_score - peer_scores.median():+.0f} vs peers")
+    with col3:
+        st.metric("Peers Scoring Lower", f"{(peer_scores < current_score).sum()} of {len(peers)}")
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fig = px.histogram(peers, x='score', nbins=10, title="Peer Scores")
+        fig.add_vline(x=current_score, line_dash="dash", line_color="red", annotation_text="You")
+        fig.update_layout(height=300, margin=dict(t=40, b=20, l=20, r=20), yaxis_title="Peers")
+        st.plotly_chart(fig, width='stretch')
+    with col2:
+        table = peers.head(10).rename(columns={
+            'customer_id': 'Customer',
+            'distance': 'Distance',
+            'score': 'Score',
+            'utilization': 'Utilization (%)',
+            'product_types': 'Product Types',
+            'active_products': 'Active',
+            'account_age_months': 'Avg Age (months)',
+            'total_credit_limit': 'Credit Limit'
+        }).astype({'Score': int, 'Product Types': int, 'Active': int})
+        st.dataframe(table.round(1), width='stretch', hide_index=True)
 
 def _render_customer_header(customer_id, product_count):
     """Render the customer header section"""
@@ -169,49 +281,45 @@ def _get_column_config():
         )
     }
 
-def _render_summary_statistics(customer_data):
-    """Render the summary statistics section"""
+def _render_summary_statistics(customer_data, aggregates):
+    """Render the summary statistics section from the customer's materialized aggregates"""
     # st.subheader("Summary Statistics")
     
-    if len(customer_data) > 0:
+    if aggregates and aggregates['rows'] > 0:
         # First row
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             with stylable_container(key="global_col0", css_styles=GLOBAL_COL_STYLE):
-                total_credit_limit = customer_data['credit_limit'].sum()
+                total_credit_limit = aggregates['total_credit_limit']
                 st.metric("Total Credit Limit", f"R {total_credit_limit:,.2f}".replace(",", " "))
         
         with col2:
-            total_current_balance = customer_data['current_balance'].sum()
+            total_current_balance = aggregates['total_current_balance']
             st.metric("Total Current Balance", f"R {total_current_balance:,.2f}".replace(",", " "))
         
         with col3:
-            total_overdue = customer_data['balance_overdue'].sum()
+            total_overdue = aggregates['total_overdue']
             st.metric("Total Overdue", f"R {total_overdue:,.2f}".replace(",", " "))
         
         with col4:
-            active_products = len(customer_data[customer_data['current_status'] == 'Active'])
-            st.metric("Active Products", active_products)
+            st.metric("Active Products", aggregates['active_products'])
         
         # Second row
         col5, col6, col7, col8 = st.columns(4)
         
         with col5:
-            total_monthly_instalment = customer_data['monthly_instalment'].sum()
+            total_monthly_instalment = aggregates['total_monthly_instalment']
             st.metric("Total Monthly Instalment", f"R {total_monthly_instalment:,.2f}".replace(",", " "))
         
         with col6:
-            utilization = (total_current_balance / total_credit_limit * 100) if total_credit_limit > 0 else 0
-            st.metric("Utilization Rate", f"{utilization:.1f}%")
+            st.metric("Utilization Rate", f"{aggregates['utilization']:.1f}%")
         
         with col7:
-            overdue_ratio = (total_overdue / total_current_balance * 100) if total_current_balance > 0 else 0
-            st.metric("Overdue Ratio", f"{overdue_ratio:.1f}%")
+            st.metric("Overdue Ratio", f"{aggregates['overdue_ratio']:.1f}%")
         
         with col8:
-            unique_subscribers = customer_data['subscriber_id'].nunique()
-            st.metric("Credit Providers", unique_subscribers)
+            st.metric("Credit Providers", aggregates['credit_providers'])
         
         # Payment statistics
         _render_payment_statistics(customer_data)
@@ -219,59 +327,32 @@ def _render_summary_statistics(customer_data):
 def _render_payment_statistics(customer_data):
     """Render payment-related statistics"""
     if len(customer_data) > 0:
-        today = datetime.now().date()
-        
-        if customer_data['last_payment_date'].dtype == 'object':
-            customer_data['last_payment_date'] = pd.to_datetime(customer_data['last_payment_date']).dt.date
-        
-        customer_data['days_since_last_payment'] = customer_data['last_payment_date'].apply(
-            lambda x: (today - x).days if pd.notnull(x) else None
-        )
+        recency = payment_recency(customer_data)
         
         col9, col10, col11, col12 = st.columns(4)
         
         with col9:
-            active_accounts = customer_data[customer_data['current_status'] == 'Active']
-            if not active_accounts.empty and 'days_since_last_payment' in active_accounts.columns:
-                valid_days = active_accounts['days_since_last_payment'].dropna()
-                if not valid_days.empty:
-                    avg_days_since_payment = valid_days.mean()
-                    st.metric("Avg Days Since Payment", f"{avg_days_since_payment:.0f} days")
-                else:
-                    st.metric("Avg Days Since Payment", "N/A")
+            avg_days_since_payment = recency.average_active_days()
+            if avg_days_since_payment is not None:
+                st.metric("Avg Days Since Payment", f"{avg_days_since_payment:.0f} days")
             else:
                 st.metric("Avg Days Since Payment", "N/A")
         
         with col10:
-            most_recent_payment = customer_data['last_payment_date'].max()
-            if pd.notnull(most_recent_payment):
-                st.metric("Most Recent Payment", most_recent_payment.strftime('%Y-%m-%d'))
+            if pd.notnull(recency.last_payment):
+                st.metric("Most Recent Payment", recency.last_payment.strftime('%Y-%m-%d'))
             else:
                 st.metric("Most Recent Payment", "N/A")
         
         with col11:
-            if 'days_since_last_payment' in customer_data.columns:
-                recent_payments = len(customer_data[
-                    (customer_data['days_since_last_payment'] <= 30) & 
-                    (customer_data['days_since_last_payment'].notna())
-                ])
-                st.metric("Recent Payments (≤30 days)", recent_payments)
-            else:
-                st.metric("Recent Payments (≤30 days)", 0)
+            st.metric("Recent Payments (≤30 days)", recency.within(30))
         
         with col12:
-            if 'days_since_last_payment' in customer_data.columns:
-                overdue_payments = len(customer_data[
-                    (customer_data['days_since_last_payment'] > 30) & 
-                    (customer_data['days_since_last_payment'].notna())
-                ])
-                st.metric("Overdue Payments (>30 days)", overdue_payments)
-            else:
-                st.metric("Overdue Payments (>30 days)", 0)
+            st.metric("Overdue Payments (>30 days)", recency.beyond(30))
 
 
 
-def _render_credit_score_dashboard(customer_data, customer_id, auth_manager=None):
+def _render_credit_score_dashboard(customer_data, customer_id, auth_manager=None, aggregates=None, percentiles=None):
     """Render the comprehensive credit score dashboard with permission checks"""
     st.markdown("---")
     st.header("📊 Credit Score Dashboard")
@@ -282,11 +363,12 @@ def _render_credit_score_dashboard(customer_data, customer_id, auth_manager=None
         can_simulate = auth_manager.has_permission('can_simulate')
     
     # Calculate current credit score
-    current_score, current_components = _calculate_credit_score(customer_data)
+    current_score, current_components = _get_cached_credit_score(customer_data, customer_id, aggregates)
     
-    # Initialize session state for historical data and target score
-    if f'score_history_{customer_id}' not in st.session_state:
-        st.session_state[f'score_history_{customer_id}'] = _generate_score_history(customer_id)
+    # Load score history and initialize the target score
+    history = _load_score_history(customer_id, current_score, current_components)
+    projection = _get_cached_projection(customer_data, customer_id)
+    attribution = _get_cached_attribution(customer_data, customer_id)
     if f'target_score_{customer_id}' not in st.session_state:
         st.session_state[f'target_score_{customer_id}'] = 80
     
@@ -295,25 +377,28 @@ def _render_credit_score_dashboard(customer_data, customer_id, auth_manager=None
         tab1, tab3, tab4 = st.tabs(["Current Score", "Score Simulation", "Improvement Plan"])
         
         with tab1:
-            _render_current_score_tab(current_score, current_components, customer_id)
+            _render_current_score_tab(current_score, current_components, customer_id, history, projection, percentiles,
+                                      attribution)
         
         with tab3:
-            _render_score_simulation_tab(current_components, customer_id)
+            _render_score_simulation_tab(customer_data, current_components, customer_id)
         
         with tab4:
-            _render_improvement_plan_tab(current_components, customer_id)
+            _render_improvement_plan_tab(customer_data, current_components, customer_id)
     else:
         tab1 = st.tabs(["Current Score"])
         
         with tab1:
-            _render_current_score_tab(current_score, current_components, customer_id)
+            _render_current_score_tab(current_score, current_components, customer_id, history, projection, percentiles,
+                                      attribution)
         
         # with tab2:
         #     _render_score_trends_tab(customer_id, current_score, current_components)
         
         st.info("🎯 Score simulation features are only available for users with simulation permissions.")
 
-def _render_current_score_tab(current_score, current_components, customer_id):
+def _render_current_score_tab(current_score, current_components, customer_id, history, projection=None,
+                              percentiles=None, attribution=None):
     """Render the current score tab"""
     col1, col2, colwide34 = st.columns([1, 1, 2])
     
@@ -326,6 +411,11 @@ def _render_current_score_tab(current_score, current_components, customer_id):
         with stylable_container(key="global_col12", css_styles=GLOBAL_COL_STYLE):
             st.subheader("Current score")
             render_credit_score_bullet_plasma(current_score)
+            if percentiles:
+                st.markdown(f"**{_ordinal(percentiles['portfolio'])}** percentile of "
+                            f"{percentiles['portfolio_size']:,} customers")
+                for subscriber_id, percentile in percentiles['subscribers'].items():
+                    st.markdown(f"**{_ordinal(percentile)}** percentile in {subscriber_id}")
 
 
     with colwide34:
@@ -405,8 +495,6 @@ def _render_current_score_tab(current_score, current_components, customer_id):
     # Second row
     colwide56, colwide78 = st.columns([2, 2])
 
-     # Get historical data
-    history = st.session_state[f'score_history_{customer_id}']  
 
     with colwide56:
         with stylable_container(key="global_col14", css_styles=GLOBAL_COL_STYLE):
@@ -457,31 +545,76 @@ def _render_current_score_tab(current_score, current_components, customer_id):
                 margin=dict(t=50, b=40, l=40, r=40)
             )
 
-            # Add horizontal line for current score
-            fig.add_hline(
-                y=current_score,
-                line_dash="dash",
-                line_color="red",
-                annotation_text="Current Score",
-                annotation_font_color='white',
-                annotation_position="top right"
-            )
-
+            # Projected score fan: 10-90th and 25-75th percentile bands around the median path
+            if projection is not None:
+                for lower, upper, opacity in (('p10', 'p90', 0.15), ('p25', 'p75', 0.3)):
+                    fig.add_trace(go.Scatter(
+                        x=projection['date'], y=projection[upper],
+                        mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'
+                    ))
+                    fig.add_trace(go.Scatter(
+                        x=projection['date'], y=projection[lower],
+                        mode='lines', line=dict(width=0), fill='tonexty',
+                        fillcolor=f'rgba(255, 99, 71, {opacity})',
+                        name=f"{lower[1:]}-{upper[1:]}th percentile"
+                    ))
+                fig.add_trace(go.Scatter(
+                    x=projection['date'], y=projection['p50'],
+                    mode='lines', line=dict(width=2, dash='dash', color='tomato'),
+                    name="Projected median"
+                ))
+            
             # Show the plot in Streamlit with a unique key
             st.plotly_chart(fig, width='stretch')
+    
+    if attribution is not None:
+        _render_account_attribution(attribution)
             
+def _ordinal(percentile):
+    """Whole percentile with its English suffix, e.g. 64th or 21st"""
+    value = int(round(percentile))
+    suffix = 'th' if 10 <= value % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(value % 10, 'th')
+    return f"{value}{suffix}"
+
+def _render_account_attribution(attribution):
+    """Render the accounts whose removal would raise the score, worst first"""
+    with stylable_container(key="global_col16", css_styles=GLOBAL_COL_STYLE):
+        st.subheader("Accounts hurting your score")
+        # Leaving out a sole account compares against an empty profile, which says nothing useful
+        if len(attribution) < 2:
+            st.info("Account attribution needs at least two accounts")
+            return
+        
+        hurting = attribution[attribution['total_impact'] < 0].sort_values('total_impact', kind='stable')
+        if hurting.empty:
+            st.success("No single account is pulling your score down")
+            return
+        
+        names = {component['column']: component['name'] for component in get_scorecard().components}
+        table = hurting.rename(columns={
+            'account_number': 'Account',
+            'product_type': 'Product',
+            'total_impact': 'Total Impact',
+            **names
+        })
+        st.dataframe(table, width='stretch', hide_index=True)
+        st.caption("Points each account adds to every component; negative means the score would be higher without it")
+
 def _render_waterfall_chart(history, current_components, plot_height=300):
     """Render a clean waterfall chart with transparent background"""
-    import numpy as np
     import plotly.graph_objects as go
 
-    previous_score = history.iloc[-2]['score']
-    current_score = history.iloc[-1]['score']
+    previous = history.iloc[-2]
+    current = history.iloc[-1]
+    previous_score = int(previous['score'])
+    current_score = int(current['score'])
 
-    # Simulate component changes
+    # Component changes between the last two snapshots
+    component_columns = {component['name']: component['column'] for component in get_scorecard().components}
     component_changes = []
     for comp in current_components:
-        change = np.random.randint(-5, 10)
+        column = component_columns[comp['name']]
+        change = int(current[column] - previous[column]) if pd.notnull(previous[column]) else 0
         component_changes.append({
             'component': comp['name'],
             'change': change,
@@ -528,10 +661,9 @@ def _render_waterfall_chart(history, current_components, plot_height=300):
     st.plotly_chart(fig, width='stretch')
 
 
-def _render_score_simulation_tab(current_components, customer_id):
+def _render_score_simulation_tab(customer_data, current_components, customer_id):
     """Render the score simulation tab"""
     st.subheader("🎯 Score Simulation")
-    st.write("Adjust the components below to see how they affect your credit score:")
     
     # Initialize session state for simulated components
     if f'simulated_components_{customer_id}' not in st.session_state:
@@ -549,6 +681,21 @@ def _render_score_simulation_tab(current_components, customer_id):
     )
     st.session_state[f'target_score_{customer_id}'] = target_score
     
+    mode = st.radio(
+        "Simulate",
+        ["Account changes", "Sensitivity grid", "Component points"],
+        horizontal=True,
+        key=f"sim_mode_{customer_id}"
+    )
+    if mode == "Account changes":
+        _render_account_simulation(customer_data, current_components, customer_id, target_score)
+        return
+    if mode == "Sensitivity grid":
+        _render_sensitivity_grid(customer_data, customer_id, target_score)
+        return
+    
+    st.write("Adjust the components below to see how they affect your credit score:")
+    
     # Component sliders
     col1, col2 = st.columns(2)
     
@@ -606,14 +753,171 @@ def _render_score_simulation_tab(current_components, customer_id):
         st.session_state[f'simulated_components_{customer_id}'] = current_components.copy()
         st.rerun()
 
-def _render_improvement_plan_tab(current_components, customer_id):
+def _render_account_simulation(customer_data, current_components, customer_id, target_score):
+    """Render what-if edits to the customer's accounts in a scratch overlay over the real data"""
+    st.write("Pay down, close or add accounts to see how they would affect your credit score:")
+    overlay = _get_whatif_overlay(customer_data, customer_id)
+    
+    # Existing accounts: widgets drive the overlay, which only refolds the account that changed
+    for key, row in customer_data.iterrows():
+        account = overlay.accounts[key]
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            balance = f"R {account['current_balance']:,.2f}".replace(",", " ")
+            st.write(f"**{row['account_number']}** ({row['product_type']})  \nBalance {balance}")
+        with col2:
+            paydown = st.number_input(
+                "Pay down (R)",
+                min_value=0.0,
+                max_value=max(account['current_balance'], 0.0),
+                value=0.0,
+                step=100.0,
+                key=f"whatif_pay_{customer_id}_{key}"
+            )
+            if paydown != overlay.paydowns.get(key, 0.0):
+                overlay.pay_down(key, paydown)
+        with col3:
+            closed = st.checkbox(
+                "Close",
+                disabled=not account['active'],
+                key=f"whatif_close_{customer_id}_{key}"
+            )
+            if closed != (key in overlay.closed):
+                overlay.close(key, closed)
+    
+    # Hypothetical new products
+    for position, product in enumerate(overlay.added):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            limit = f"R {product['credit_limit']:,.2f}".replace(",", " ")
+            st.write(f"➕ New **{product['product_type']}**, limit {limit}")
+        with col2:
+            if st.button("Remove", key=f"whatif_remove_{customer_id}_{position}"):
+                overlay.remove_product(position)
+                st.rerun()
+    
+    with st.expander("Add a hypothetical product"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            product_type = st.text_input("Product type", value="Credit Card", key=f"whatif_type_{customer_id}")
+        with col2:
+            credit_limit = st.number_input("Credit limit (R)", min_value=0.0, value=5000.0, step=500.0,
+                                           key=f"whatif_limit_{customer_id}")
+        with col3:
+            new_balance = st.number_input("Balance (R)", min_value=0.0, value=0.0, step=500.0,
+                                          key=f"whatif_balance_{customer_id}")
+        if st.button("Add Product", key=f"whatif_add_{customer_id}"):
+            overlay.add_product(product_type, credit_limit, new_balance)
+            st.rerun()
+    
+    # Display results
+    current_score = sum(comp["points"] for comp in current_components)
+    simulated_score = overlay.score()['total_score']
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Current Score", current_score)
+    
+    with col2:
+        st.metric("Simulated Score", simulated_score, delta=simulated_score - current_score)
+    
+    with col3:
+        st.metric("Target Score", target_score, delta=simulated_score - target_score)
+    
+    changes = pd.DataFrame(overlay.changes()).rename(columns={
+        'name': 'Component',
+        'current_points': 'Current',
+        'simulated_points': 'Simulated',
+        'max_points': 'Max'
+    })
+    st.dataframe(changes, width='stretch', hide_index=True)
+    
+    # Reset button
+    if st.button("Reset Account Changes", key=f"whatif_reset_{customer_id}"):
+        overlay.reset()
+        for widget in [k for k in st.session_state if str(k).startswith((f"whatif_pay_{customer_id}_",
+                                                                         f"whatif_close_{customer_id}_"))]:
+            del st.session_state[widget]
+        st.rerun()
+
+def _get_whatif_overlay(customer_data, customer_id):
+    """Scratch overlay for the customer, rebuilt only when their rows change"""
+    fingerprint = customer_fingerprint(customer_data)
+    cached = st.session_state.get(f'whatif_{customer_id}')
+    if cached is None or cached[0] != fingerprint:
+        overlay = WhatIfOverlay(customer_data)
+        # Hypothetical products survive edits to the real rows
+        if cached is not None:
+            for product in cached[1].added:
+                overlay.add_product(product['product_type'], product['credit_limit'], product['current_balance'])
+        cached = (fingerprint, overlay)
+        st.session_state[f'whatif_{customer_id}'] = cached
+    return cached[1]
+
+def _render_sensitivity_grid(customer_data, customer_id, target_score):
+    """Render a heatmap of the score over two features, holding the others at the customer's values"""
+    st.write("See how your score responds to two factors at once:")
+    
+    features = list(FEATURE_RANGES)
+    col1, col2 = st.columns(2)
+    with col1:
+        x = st.selectbox("Horizontal axis", features, index=features.index('utilization'),
+                         format_func=FEATURE_LABELS.get, key=f"sens_x_{customer_id}")
+    with col2:
+        y = st.selectbox("Vertical axis", [feature for feature in features if feature != x],
+                         format_func=FEATURE_LABELS.get, key=f"sens_y_{customer_id}")
+    
+    current, grid = _get_cached_sensitivity_grid(customer_data, customer_id, x, y)
+    
+    fig = go.Figure(go.Heatmap(
+        z=grid.to_numpy(),
+        x=grid.columns,
+        y=grid.index,
+        colorscale='Plasma',
+        colorbar=dict(title="Score"),
+        hovertemplate=f"{FEATURE_LABELS[x]}: %{{x}}<br>{FEATURE_LABELS[y]}: %{{y}}<br>Score: %{{z}}<extra></extra>"
+    ))
+    # Contour at the target and a marker at where the customer is today
+    fig.add_trace(go.Contour(
+        z=grid.to_numpy(), x=grid.columns, y=grid.index,
+        contours=dict(start=target_score, end=target_score, coloring='none', showlabels=True),
+        line=dict(color='white', dash='dash'), showscale=False, hoverinfo='skip', name="Target"
+    ))
+    # Values beyond the grid are pinned to its edge so the marker stays visible
+    fig.add_trace(go.Scatter(
+        x=[np.clip(current[x], grid.columns.min(), grid.columns.max())],
+        y=[np.clip(current[y], grid.index.min(), grid.index.max())],
+        mode='markers',
+        marker=dict(size=14, color='cyan', symbol='x'),
+        name="You today",
+        hovertext=f"{FEATURE_LABELS[x]}: {current[x]:.1f}<br>{FEATURE_LABELS[y]}: {current[y]:.1f}",
+        hoverinfo='text'
+    ))
+    fig.update_layout(
+        height=420,
+        xaxis_title=FEATURE_LABELS[x],
+        yaxis_title=FEATURE_LABELS[y],
+        margin=dict(t=30, b=40, l=40, r=20)
+    )
+    st.plotly_chart(fig, width='stretch')
+
+def _get_cached_sensitivity_grid(customer_data, customer_id, x, y):
+    """Customer features and their score grid, computed once per fingerprint, axes and day"""
+    today = datetime.now().date()
+    key = ('sensitivity', customer_id, customer_fingerprint(customer_data), x, y, today)
+    cached = score_cache.get(key)
+    if cached is None:
+        current = customer_features(customer_data, today).iloc[0].to_dict()
+        cached = (current, sensitivity_grid(current, x, y))
+        score_cache.put(key, cached, tag=customer_id)
+    return cached
+
+def _render_improvement_plan_tab(customer_data, current_components, customer_id):
     """Render the improvement plan tab"""
     st.subheader("📋 Personalized Improvement Plan")
     
     target_score = st.session_state[f'target_score_{customer_id}']
-    simulated_components = st.session_state[f'simulated_components_{customer_id}']
     current_score = sum(comp["points"] for comp in current_components)
-    simulated_score = sum(comp["points"] for comp in simulated_components)
     
     # Calculate improvement needed
     improvement_needed = target_score - current_score
@@ -624,47 +928,60 @@ def _render_improvement_plan_tab(current_components, customer_id):
     
     st.write(f"To reach your target score of **{target_score}**, you need **{improvement_needed}** additional points.")
     
-    # Generate improvement recommendations
-    recommendations = _generate_improvement_recommendations(current_components, target_score)
+    # Cheapest account-level actions reaching the target
+    plan = _get_cached_improvement_plan(customer_data, customer_id, target_score)
+    
+    if not plan.reachable:
+        st.warning(f"A target of {target_score} is out of reach; the plan below gets you to **{plan.score}**.")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Planned Score", plan.score, delta=plan.score - current_score)
+    with col2:
+        st.metric("Pay Down", f"R {plan.paydown:,.2f}".replace(",", " "))
+    with col3:
+        st.metric("Accounts to Catch Up", len(plan.catch_up))
+    with col4:
+        st.metric("New Products", plan.new_accounts)
     
     st.subheader("Recommended Actions")
     
-    for i, rec in enumerate(recommendations, 1):
-        with st.expander(f"#{i}: {rec['component']} (+{rec['potential_points']} points)"):
-            st.write(f"**Current:** {rec['current_state']}")
-            st.write(f"**Target:** {rec['target_state']}")
+    actions = []
+    if plan.paydown > 0:
+        paydown = f"R {plan.paydown:,.2f}".replace(",", " ")
+        actions.append(f"Pay **{paydown}** off your balances, starting with overdue amounts")
+    for account in plan.catch_up:
+        instalment = f"R {account['instalment']:,.2f}".replace(",", " ")
+        actions.append(
+            f"Bring **{account['account_number']}** ({account['product_type']}) up to date: "
+            f"last paid {account['days_since_payment']} days ago, instalment {instalment}"
+        )
+    if plan.new_accounts > 0:
+        actions.append(f"Open **{plan.new_accounts}** product(s) of a type you do not hold yet")
+    for i, action in enumerate(actions, 1):
+        st.write(f"{i}. {action}")
+    
+    for gain in plan.gains():
+        with st.expander(f"{gain['name']} (+{gain['planned_points'] - gain['current_points']} points)"):
+            st.write(f"**Target:** {_get_target_description(gain['name'])}")
             st.write(f"**Action Steps:**")
-            for step in rec['action_steps']:
+            for step in _get_action_steps(gain['name'], gain['current_points'], gain['max_points']):
                 st.write(f"• {step}")
             
             # Progress indicator
-            progress = min((rec['current_points'] / rec['target_points']) * 100, 100)
+            progress = min((gain['current_points'] / gain['planned_points']) * 100, 100)
             st.write(f"**Progress:** {progress:.1f}%")
             st.progress(progress / 100)
 
-def _generate_improvement_recommendations(current_components, target_score):
-    """Generate personalized improvement recommendations"""
-    recommendations = []
-    
-    for comp in current_components:
-        potential_improvement = comp["max_points"] - comp["points"]
-        
-        if potential_improvement > 0:
-            recommendation = {
-                'component': comp['name'],
-                'current_points': comp['points'],
-                'target_points': comp['max_points'],
-                'potential_points': potential_improvement,
-                'current_state': comp['description'],
-                'target_state': _get_target_description(comp['name']),
-                'action_steps': _get_action_steps(comp['name'], comp['points'], comp['max_points'])
-            }
-            recommendations.append(recommendation)
-    
-    # Sort by potential impact (highest first)
-    recommendations.sort(key=lambda x: x['potential_points'], reverse=True)
-    
-    return recommendations[:3]  # Return top 3 recommendations
+def _get_cached_improvement_plan(customer_data, customer_id, target_score):
+    """Solve for the target score once per customer data fingerprint, target and day"""
+    today = datetime.now().date()
+    key = ('plan', customer_id, customer_fingerprint(customer_data), target_score, today)
+    plan = score_cache.get(key)
+    if plan is None:
+        plan = solve_target(customer_data, target_score, today)
+        score_cache.put(key, plan, tag=customer_id)
+    return plan
 
 def _get_target_description(component_name):
     """Get target description for each component"""
@@ -711,151 +1028,109 @@ def _get_action_steps(component_name, current_points, max_points):
         ]
     return ["Consult with a financial advisor for personalized guidance"]
 
-def _generate_score_history(customer_id, periods=12):
-    """Generate mock historical score data"""
-    dates = pd.date_range(end=datetime.now(), periods=periods, freq='ME')
-    base_score = 65  # Starting score
-    
-    history = []
-    current_score = base_score
-    for date in dates:
-        # Simulate some variation
-        change = np.random.randint(-5, 8)
-        current_score = max(0, min(100, current_score + change))
-        history.append({
-            'date': date,
-            'score': current_score,
-            'customer_id': customer_id
-        })
-    
-    return pd.DataFrame(history)
-
-def _calculate_credit_score(customer_data):
-    """Calculate credit score based on customer data"""
-    total_credit_limit = customer_data['credit_limit'].sum()
-    total_current_balance = customer_data['current_balance'].sum()
-    total_overdue = customer_data['balance_overdue'].sum()
-    active_products = len(customer_data[customer_data['current_status'] == 'Active'])
+def _load_score_history(customer_id, current_score, current_components, months=12):
+    """Load the customer's snapshot history for the last months, ending with the live score"""
+    today = datetime.now().date()
+    history = score_history.customer_history(customer_id, start=today - relativedelta(months=months))
+    history = history[history['date'] < pd.Timestamp(today)]
     
-    # Calculate utilization rate
-    utilization = (total_current_balance / total_credit_limit * 100) if total_credit_limit > 0 else 0
+    points_by_name = {comp['name']: comp['points'] for comp in current_components}
+    live = {'date': pd.Timestamp(today), 'total_score': current_score}
+    for component in get_scorecard().components:
+        live[component['column']] = points_by_name.get(component['name'])
     
-    # Calculate days since last payment (for active accounts)
+    rows = history.to_dict('records') + [live]
+    history = pd.DataFrame(rows).rename(columns={'total_score': 'score'})
+    history['customer_id'] = customer_id
+    return history
+
+def _get_cached_projection(customer_data, customer_id, months=12):
+    """Monte Carlo score outlook, simulated once per customer data fingerprint and day"""
     today = datetime.now().date()
-    if customer_data['last_payment_date'].dtype == 'object':
-        customer_data['last_payment_date'] = pd.to_datetime(customer_data['last_payment_date']).dt.date
-    
-    active_accounts = customer_data[customer_data['current_status'] == 'Active']
-    if not active_accounts.empty:
-        active_accounts['days_since_last_payment'] = active_accounts['last_payment_date'].apply(
-            lambda x: (today - x).days if pd.notnull(x) else 90
-        )
-        avg_days_since_payment = active_accounts['days_since_last_payment'].mean()
+    fingerprint = customer_fingerprint(customer_data)
+    key = ('projection', customer_id, fingerprint, today, months)
+    projection = score_cache.get(key)
+    if projection is None:
+        # Seeding from the fingerprint keeps the fan steady across reruns
+        projection = project_scores(customer_data, months=months, today=today, seed=int(fingerprint[:8], 16))
+        score_cache.put(key, projection, tag=customer_id)
+    return projection
+
+def _get_cached_attribution(customer_data, customer_id):
+    """Per-account component attribution, computed once per customer data fingerprint and day"""
+    today = datetime.now().date()
+    key = ('attribution', customer_id, customer_fingerprint(customer_data), today)
+    attribution = score_cache.get(key)
+    if attribution is None:
+        attribution = account_attribution(customer_data, today)
+        score_cache.put(key, attribution, tag=customer_id)
+    return attribution
+
+def _get_cached_credit_score(customer_data, customer_id, aggregates=None):
+    """Calculate the credit score, reusing the shared cache while the customer's rows are unchanged"""
+    key = (customer_id, customer_fingerprint(customer_data), datetime.now().date())
+    cached = score_cache.get(key)
+    if cached is None:
+        cached = _calculate_credit_score(customer_data, aggregates)
+        score_cache.put(key, cached, tag=customer_id)
+    total_score, score_components = cached
+    return total_score, [component.copy() for component in score_components]
+
+def _calculate_credit_score(customer_data, aggregates=None):
+    """Calculate credit score based on customer data, or its materialized aggregates when given"""
+    if aggregates is not None:
+        total_credit_limit = aggregates['total_credit_limit']
+        total_current_balance = aggregates['total_current_balance']
+        total_overdue = aggregates['total_overdue']
+        active_products = aggregates['active_products']
+        unique_products = aggregates['product_types']
+        utilization = aggregates['utilization']
+        avg_days_since_payment = aggregates['avg_days_since_payment']
     else:
-        avg_days_since_payment = 90
+        total_credit_limit = customer_data['credit_limit'].sum()
+        total_current_balance = customer_data['current_balance'].sum()
+        total_overdue = customer_data['balance_overdue'].sum()
+        active_products = len(customer_data[customer_data['current_status'] == 'Active'])
+        unique_products = customer_data['product_type'].nunique()
+        
+        # Calculate utilization rate
+        utilization = (total_current_balance / total_credit_limit * 100) if total_credit_limit > 0 else 0
+        
+        # Calculate days since last payment (for active accounts)
+        avg_days_since_payment = payment_recency(customer_data).scoring_days()
+    
+    overdue_ratio = (total_overdue / total_current_balance * 100) if total_current_balance > 0 else 0
     
-    # Score components
+    # Score components, banded by the active scorecard
+    scorecard = get_scorecard()
+    points = scorecard.score_one({
+        'utilization': utilization,
+        'avg_days_since_payment': avg_days_since_payment,
+        'product_types': unique_products,
+        'active_products': active_products,
+        'overdue_ratio': overdue_ratio
+    })
+    descriptions = {
+        'utilization': f"Utilization: {utilization:.1f}%",
+        'avg_days_since_payment': f"Avg days since payment: {avg_days_since_payment:.0f}",
+        'product_types': f"Product types: {unique_products}",
+        'active_products': f"Active accounts: {active_products}",
+        'overdue_ratio': f"Overdue ratio: {overdue_ratio:.1f}%"
+    }
     score_components = [
         {
-            "name": "Credit Utilization",
-            "points": _calculate_utilization_points(utilization),
-            "max_points": 40,
-            "description": f"Utilization: {utilization:.1f}%"
-        },
-        {
-            "name": "Payment History",
-            "points": _calculate_payment_points(avg_days_since_payment),
-            "max_points": 25,
-            "description": f"Avg days since payment: {avg_days_since_payment:.0f}"
-        },
-        {
-            "name": "Credit Mix",
-            "points": _calculate_credit_mix_points(customer_data),
-            "max_points": 20,
-            "description": f"Product types: {customer_data['product_type'].nunique()}"
-        },
-        {
-            "name": "Account Age & Activity",
-            "points": _calculate_account_age_points(customer_data),
-            "max_points": 10,
-            "description": f"Active accounts: {active_products}"
-        },
-        {
-            "name": "Overdue Behavior",
-            "points": _calculate_overdue_points(total_overdue, total_current_balance),
-            "max_points": 5,
-            "description": f"Overdue ratio: {(total_overdue/total_current_balance*100) if total_current_balance > 0 else 0:.1f}%"
+            "name": component['name'],
+            "points": int(points[component['column']]),
+            "max_points": component['max_points'],
+            "description": descriptions[component['feature']]
         }
+        for component in scorecard.components
     ]
     
     total_score = sum(component["points"] for component in score_components)
     
     return total_score, score_components
 
-def _calculate_utilization_points(utilization):
-    """Calculate points for credit utilization"""
-    if utilization <= 10:
-        return 40
-    elif utilization <= 30:
-        return 35
-    elif utilization <= 50:
-        return 25
-    elif utilization <= 75:
-        return 15
-    else:
-        return 5
-
-def _calculate_payment_points(avg_days):
-    """Calculate points for payment history"""
-    if avg_days <= 15:
-        return 25
-    elif avg_days <= 30:
-        return 20
-    elif avg_days <= 45:
-        return 15
-    elif avg_days <= 60:
-        return 10
-    else:
-        return 5
-
-def _calculate_credit_mix_points(customer_data):
-    """Calculate points for credit mix diversity"""
-    unique_products = customer_data['product_type'].nunique()
-    if unique_products >= 4:
-        return 20
-    elif unique_products >= 3:
-        return 15
-    elif unique_products >= 2:
-        return 10
-    else:
-        return 5
-
-def _calculate_account_age_points(customer_data):
-    """Calculate points for account age and activity"""
-    active_accounts = len(customer_data[customer_data['current_status'] == 'Active'])
-    if active_accounts >= 4:
-        return 10
-    elif active_accounts >= 3:
-        return 8
-    elif active_accounts >= 2:
-        return 6
-    else:
-        return 4
-
-def _calculate_overdue_points(total_overdue, total_balance):
-    """Calculate points for overdue behavior"""
-    overdue_ratio = (total_overdue / total_balance * 100) if total_balance > 0 else 0
-    if overdue_ratio == 0:
-        return 5
-    elif overdue_ratio <= 5:
-        return 4
-    elif overdue_ratio <= 10:
-        return 3
-    elif overdue_ratio <= 20:
-        return 2
-    else:
-        return 1
-
 def render_credit_score_bullet_plasma(
     score,
     max_score=100,
@@ -868,16 +1143,7 @@ def render_credit_score_bullet_plasma(
     key="credit_score_bullet_plasma"
 ):
     # ---------- Category logic ----------
-    if score >= 90:
-        category = "Excellent"
-    elif score >= 75:
-        category = "Good"
-    elif score >= 60:
-        category = "Fair"
-    elif score >= 40:
-        category = "Poor"
-    else:
-        category = "Very Poor"
+    category = _get_score_category(score)
 
     plasma = sequential.Plasma
     cat_color = plasma[-2]
@@ -885,8 +1151,8 @@ def render_credit_score_bullet_plasma(
     # ---------- Figure ----------
     fig = go.Figure()
 
-    # Thresholds (traditional credit bands)
-    thresholds = [0, 40, 60, 75, 90, max_score]
+    # Thresholds (scorecard category bands)
+    thresholds = [0] + list(get_scorecard().categories.edges) + [max_score]
     steps = 40  # smoothness of gradient
 
     # ---------- Gradient background bars ----------
@@ -981,19 +1247,13 @@ def _render_credit_score_bullet(
     """
 
     # Determine score category
-    if score >= 90:
-        category, cat_color = "Excellent", sequential.Blues[-1]
-    elif score >= 75:
-        category, cat_color = "Good", sequential.Blues[-2]
-    elif score >= 60:
-        category, cat_color = "Fair", sequential.Blues[-3]
-    elif score >= 40:
-        category, cat_color = "Poor", sequential.Blues[-4]
-    else:
-        category, cat_color = "Very Poor", sequential.Blues[2]
+    category_bands = get_scorecard().categories
+    category = _get_score_category(score)
+    cat_color = [sequential.Blues[2], sequential.Blues[-4], sequential.Blues[-3],
+                 sequential.Blues[-2], sequential.Blues[-1]][min(int(category_bands.band(score)), 4)]
 
     # Thresholds for bars
-    thresholds = [0, 40, 60, 75, 90, max_score]
+    thresholds = [0] + list(category_bands.edges) + [max_score]
     n_steps = 50
     blues_colors = sequential.Blues[::-1]  # dark = high score
 
@@ -1061,16 +1321,7 @@ def _render_credit_score_bullet(
 
 def _get_score_category(score):
     """Get score category"""
-    if score >= 90:
-        return "Excellent"
-    elif score >= 75:
-        return "Good"
-    elif score >= 60:
-        return "Fair"
-    elif score >= 40:
-        return "Poor"
-    else:
-        return "Very Poor"
+    return get_scorecard().category(score)
 
 def _render_no_data_view(manager, customer_id, auth_manager=None):
     """Render view when no customer data is found"""
@@ -1097,11 +1348,11 @@ def _render_no_data_view(manager, customer_id, auth_manager=None):
 def _render_available_customers(manager, auth_manager=None):
     """Render the available customers section"""
     st.subheader("Available Customers")
-    unique_customers = manager.get_all_customer_ids()
+    unique_customers = manager.get_view('portfolio_totals').first_customers(6)
     
     if len(unique_customers) > 0:
         cols = st.columns(3)
-        for i, customer in enumerate(unique_customers[:6]):
+        for i, customer in enumerate(unique_customers):
             with cols[i % 3]:
                 if st.button(f"{customer}", width='stretch', key=f"cust_btn_{customer}"):
                     st.session_state.current_customer_id = customer
@@ -1109,20 +1360,34 @@ def _render_available_customers(manager, auth_manager=None):
                     st.rerun()
 
 def _render_dataset_overview(manager, auth_manager=None):
-    """Render the dataset overview section"""
+    """Render the dataset overview section from the incrementally maintained portfolio totals"""
     st.subheader("Dataset Overview")
-    col1, col2, col3, col4 = st.columns(4)
+    portfolio_totals = manager.get_view('portfolio_totals')
+    totals = portfolio_totals.totals()
+    col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        st.metric("Total Customers", len(manager.get_all_customer_ids()))
+        st.metric("Total Customers", totals['customers'])
     
     with col2:
-        st.metric("Total Products", len(st.session_state.data))
+        st.metric("Total Products", totals['products'])
     
     with col3:
-        active_count = len(st.session_state.data[st.session_state.data['current_status'] == 'Active'])
-        st.metric("Active Products", active_count)
+        st.metric("Active Products", totals['active_products'])
     
     with col4:
-        total_credit = st.session_state.data['credit_limit'].sum()
-        st.metric("Total Credit Limit", f"${total_credit:,.0f}")
\ No newline at end of file
+        st.metric("Total Credit Limit", f"${totals['credit_limit']:,.0f}")
+    
+    with col5:
+        st.metric("Total Overdue", f"${totals['balance_overdue']:,.0f}")
+    
+    with st.expander("Totals by subscriber"):
+        breakdown = portfolio_totals.by_subscriber().rename(columns={
+            'subscriber_id': 'Subscriber',
+            'customers': 'Customers',
+            'products': 'Products',
+            'active_products': 'Active Products',
+            'credit_limit': 'Credit Limit',
+            'balance_overdue': 'Overdue'
+        })
+        st.dataframe(breakdown, width='stretch', hide_index=True)
\ No newline at end of file
@@ -1,15 +1,55 @@
+import uuid
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from auth.permissions import RowLevelSecurity
+from models.aggregates import CustomerAggregates, PortfolioTotals
+from models.amortization import BalanceOutlook
+from models.bitmap_index import BitmapIndex
+from models.cache import score_cache
+from models.histograms import PortfolioHistograms
+from models.kpis import cached_subscriber_kpis
+from models.peers import PeerIndex
+from models.ranks import ScoreRanks
+from models.recency import AgingReport
+from models.scoring import EncodedPortfolio
+from models.store import SharedStore
+from models.watchlist import RiskWatchlist
+from models.views import DataChange
+
+# Materialized views kept per session and maintained by deltas on every edit
+VIEW_TYPES = {
+    'customer_aggregates': CustomerAggregates,
+    'portfolio_totals': PortfolioTotals,
+    'encoded_portfolio': EncodedPortfolio,
+    'score_ranks': ScoreRanks,
+    'peer_index': PeerIndex,
+    'balance_outlook': BalanceOutlook,
+    'portfolio_histograms': PortfolioHistograms,
+    'bitmap_index': BitmapIndex,
+    'risk_watchlist': RiskWatchlist,
+    'aging_report': AgingReport,
+}
+
+
+def _changed_rows(before, after):
+    """Rows only in before and rows only in after, compared on every column"""
+    before_rows = pd.MultiIndex.from_frame(before.astype(str))
+    after_rows = pd.MultiIndex.from_frame(after[before.columns].astype(str))
+    return before[~before_rows.isin(after_rows)], after[~after_rows.isin(before_rows)]
+
 
 class CreditProfileManager:
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store or SharedStore()
         self.initialize_session_state()
     
     def initialize_session_state(self):
         """Initialize session state variables"""
-        if 'data' not in st.session_state:
-            st.session_state.data = self.load_sample_data()
+        if st.session_state.get('data') is None:
+            self.load_from_store()
+        else:
+            self.sync()
         
         if 'undo_stack' not in st.session_state:
             st.session_state.undo_stack = []
@@ -45,6 +85,97 @@ class CreditProfileManager:
         df['last_payment_date'] = pd.to_datetime(df['last_payment_date']).dt.date
         return df
     
+    def load_from_store(self):
+        """Load the shared portfolio into this session, seeding it on first run"""
+        if not self.store.exists():
+            self.store.seed(self.load_sample_data())
+        data, version = self.store.load()
+        scope = st.session_state.get('data_scope')
+        if scope is not None:
+            data = RowLevelSecurity.filter_data_by_subscriber(data, scope)
+        st.session_state.data = data
+        st.session_state.data_version = version
+        # Snapshots taken before the reload would undo other replicas' edits
+        st.session_state.undo_stack = []
+        st.session_state.redo_stack = []
+        self._reset_views()
+    
+    def sync(self):
+        """Reload the session data if another replica published a newer portfolio"""
+        if self.store.version() != st.session_state.get('data_version'):
+            self.load_from_store()
+    
+    def apply_row_level_security(self, subscriber_ids):
+        """Restrict the session data to the given subscribers"""
+        st.session_state.data_scope = list(subscriber_ids)
+        data = st.session_state.data
+        if 'subscriber_id' in data.columns and not data['subscriber_id'].isin(subscriber_ids).all():
+            st.session_state.data = RowLevelSecurity.filter_data_by_subscriber(data, subscriber_ids)
+            self._reset_views()
+    
+    def publish(self, removed=None, added=None):
+        """Merge one edit of this session into the shared store"""
+        version = self.store.merge_rows(removed, added)
+        if version != st.session_state.get('data_version', 0) + 1:
+            # Another replica published since this session loaded; pick up its rows
+            self.load_from_store()
+        else:
+            st.session_state.data_version = version
+    
+    def get_view(self, name):
+        """Materialized view over the session data, built on first use"""
+        if 'views' not in st.session_state:
+            st.session_state.views = {}
+        view = st.session_state.views.get(name)
+        if view is None or view.is_stale(datetime.now().date()):
+            view = VIEW_TYPES[name](st.session_state.data)
+            st.session_state.views[name] = view
+        return view
+    
+    def get_customer_aggregates(self, customer_id):
+        """Totals and counts for one customer without scanning the data"""
+        return self.get_view('customer_aggregates').get(customer_id)
+    
+    def get_customer_percentiles(self, customer_id):
+        """Percentile of the customer's score in the portfolio and in each of its subscribers"""
+        return self.get_view('score_ranks').get(customer_id)
+    
+    def get_customer_peers(self, customer_id, k=20):
+        """The k customers most similar to this one, nearest first, with their scores"""
+        return self.get_view('peer_index').nearest(customer_id, k)
+    
+    def get_risk_watchlist(self, n=20):
+        """The n customers furthest over a risk threshold, most severe first"""
+        return self.get_view('risk_watchlist').top(n)
+    
+    def get_subscriber_kpis(self, subscriber_ids):
+        """KPIs of each subscriber, recomputed only for partitions published since they were cached.
+
+        The average score is that of the customers' portfolio scores, as shown
+        everywhere else, read from the score ranks.
+        """
+        versions = self.store.channel.versions.read()
+        if versions.get(self.store.NAMESPACE) != st.session_state.get('data_version'):
+            versions = None  # the session is behind the store, its partitions must not be cached
+        kpis = cached_subscriber_kpis(st.session_state.data, subscriber_ids, versions)
+        if not kpis.empty:
+            ranks = self.get_view('score_ranks')
+            position = list(kpis.columns).index('overdue_ratio') + 1
+            kpis.insert(position, 'average_score', [ranks.subscriber_mean(s) for s in kpis.index])
+        return kpis
+    
+    def _reset_views(self):
+        """Drop every view after the session data was replaced wholesale"""
+        st.session_state.views = {}
+    
+    def _rows_changed(self, removed=None, added=None):
+        """Drop cached results and fold an edit into every view built so far"""
+        change = DataChange(removed, added, st.session_state.data)
+        for customer_id in change.customer_ids:
+            score_cache.invalidate(customer_id)
+        for view in st.session_state.get('views', {}).values():
+            view.apply(change)
+    
     def get_all_customer_ids(self):
         """Get all unique customer IDs for the dropdown"""
         return sorted(st.session_state.data['customer_id'].unique())
@@ -56,7 +187,7 @@ class CreditProfileManager:
         new_row = {
             'customer_id': customer_id,
             'product_type': 'New Product',
-            'account_number': f'NEW{len(st.session_state.data) + 1}',
+            'account_number': f'NEW{uuid.uuid4().hex[:8].upper()}',
             'opening_date': datetime.now().date(),
             'last_payment_date': datetime.now().date(),
             'opening_balance': 0,
@@ -71,6 +202,8 @@ class CreditProfileManager:
         
         new_df = pd.DataFrame([new_row])
         st.session_state.data = pd.concat([st.session_state.data, new_df], ignore_index=True)
+        self.publish(added=new_df)
+        self._rows_changed(added=new_df)
         st.success(f"Added new row for customer {customer_id}")
     
     # NEW METHOD: Delete row with permission checks
@@ -96,7 +229,10 @@ class CreditProfileManager:
                             st.error("You don't have permission to delete this record.")
                             return False
             
+            deleted_row = st.session_state.data.loc[[actual_index]]
             st.session_state.data = st.session_state.data.drop(actual_index).reset_index(drop=True)
+            self.publish(removed=deleted_row)
+            self._rows_changed(removed=deleted_row)
             st.success("Row deleted successfully")
             return True
         else:
@@ -130,6 +266,10 @@ class CreditProfileManager:
                 for col in edited_df.columns:
                     st.session_state.data.at[actual_index, col] = new_row[col]
         
+        before = st.session_state.undo_stack[-1].loc[customer_indices]
+        after = st.session_state.data.loc[customer_indices]
+        self.publish(*_changed_rows(before, after))
+        self._rows_changed(removed=before, added=after)
         st.success("Changes saved successfully!")
     
     # NEW METHOD: Save state for undo/redo
@@ -145,6 +285,8 @@ class CreditProfileManager:
         if st.session_state.undo_stack:
             st.session_state.redo_stack.append(st.session_state.data.copy())
             st.session_state.data = st.session_state.undo_stack.pop()
+            self.publish(*_changed_rows(st.session_state.redo_stack[-1], st.session_state.data))
+            self._reset_views()
             st.rerun()
     
     # NEW METHOD: Redo
@@ -153,6 +295,8 @@ class CreditProfileManager:
         if st.session_state.redo_stack:
             st.session_state.undo_stack.append(st.session_state.data.copy())
             st.session_state.data = st.session_state.redo_stack.pop()
+            self.publish(*_changed_rows(st.session_state.undo_stack[-1], st.session_state.data))
+            self._reset_views()
             st.rerun()
     
     # NEW METHOD: Get customer data
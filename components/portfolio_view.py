@@ -0,0 +1,377 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+from auth.permissions import RowLevelSecurity
+from models.bitmap_index import run_query
+from models.recency import NO_PAYMENT_LABEL, RECENCY_LABELS
+from models.watchlist import RISK_THRESHOLDS
+
+from models.stress import StressScenario, run_stress_test
+
+def render_portfolio_view(manager, auth_manager=None):
+    """Render portfolio-wide analytics below the welcome screen"""
+    can_simulate = True
+    if auth_manager:
+        can_simulate = auth_manager.has_permission('can_simulate')
+    
+    _render_subscriber_dashboard(manager, auth_manager)
+    _render_risk_watchlist(manager)
+    _render_aging_report(manager, auth_manager)
+    _render_score_analytics(manager)
+    _render_query_builder(manager, auth_manager)
+    _render_balance_outlook(manager)
+    
+    if can_simulate:
+        _render_stress_test(manager)
+
+def _render_subscriber_dashboard(manager, auth_manager=None):
+    """Render exposure, utilization, overdue, score and status KPIs for every accessible subscriber"""
+    data = st.session_state.data
+    user = auth_manager.get_current_user() if auth_manager else None
+    is_admin = user is None or user.role == 'admin'
+    subscriber_ids = RowLevelSecurity.get_accessible_subscribers(data, user.subscriber_ids if user else [], is_admin)
+    if not subscriber_ids:
+        return
+    
+    st.subheader("Subscriber Dashboard")
+    kpis = manager.get_subscriber_kpis(sorted(subscriber_ids))
+    if kpis.empty:
+        return
+    
+    table = pd.DataFrame({
+        'Customers': kpis['customers'].astype(int),
+        'Accounts': kpis['accounts'].astype(int),
+        'Exposure': kpis['exposure'].map(lambda x: f"R {x:,.2f}".replace(",", " ")),
+        'Utilization': kpis['utilization'].map(lambda x: f"{x:.1f}%"),
+        'Overdue Ratio': kpis['overdue_ratio'].map(lambda x: f"{x:.1f}%"),
+        'Average Score': kpis['average_score'].round(1)
+    }, index=kpis.index.rename('Subscriber'))
+    st.dataframe(table, width='stretch')
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=kpis.index, y=kpis['credit_limit'], name="Credit limit", marker_color='#3DF1DF'))
+        fig.add_trace(go.Bar(x=kpis.index, y=kpis['exposure'], name="Exposure", marker_color='#164DF2'))
+        fig.add_trace(go.Bar(x=kpis.index, y=kpis['overdue'], name="Overdue", marker_color='#F24316'))
+        fig.update_layout(
+            height=300,
+            title="Exposure by subscriber",
+            yaxis_title="R",
+            barmode='group',
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+    with col2:
+        fig = go.Figure()
+        for column in [column for column in kpis.columns if column.startswith('status_')]:
+            fig.add_trace(go.Bar(x=kpis.index, y=kpis[column], name=column[len('status_'):]))
+        fig.update_layout(
+            height=300,
+            title="Account status mix",
+            yaxis_title="Share of accounts (%)",
+            barmode='stack',
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+
+def _render_risk_watchlist(manager):
+    """Render the customers furthest over a risk threshold, most severe first"""
+    st.subheader("Risk Watchlist")
+    watchlist = manager.get_view('risk_watchlist')
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(
+            f"Customers with overdue above R {RISK_THRESHOLDS['total_overdue']:,.0f}".replace(",", " ")
+            + f", utilization above {RISK_THRESHOLDS['utilization']:.0f}%"
+            + f" or {RISK_THRESHOLDS['avg_days_since_payment']:.0f}+ days since payment"
+        )
+    with col2:
+        st.metric("Customers Flagged", f"{len(watchlist):,}".replace(",", " "))
+    
+    top = manager.get_risk_watchlist(st.selectbox("Show", [10, 20, 50, 100], index=1, key="watchlist_size"))
+    if top.empty:
+        st.info("No customers over a risk threshold")
+        return
+    
+    table = pd.DataFrame({
+        'Customer ID': top['customer_id'],
+        'Severity': top['severity'].round(2),
+        'Breaches': top['breaches'],
+        'Overdue': top['total_overdue'].map(lambda x: f"R {x:,.2f}".replace(",", " ")),
+        'Utilization': top['utilization'].map(lambda x: f"{x:.1f}%"),
+        'Days Since Payment': top['avg_days_since_payment'].round(0).astype('Int64')
+    })
+    st.dataframe(table, width='stretch', hide_index=True)
+
+def _render_aging_report(manager, auth_manager=None):
+    """Render overdue balances aged by days since last payment, with a CSV export"""
+    st.subheader("Delinquency Aging")
+    groupings = {
+        "Subscriber and product": ['subscriber_id', 'product_type'],
+        "Subscriber": ['subscriber_id'],
+        "Product": ['product_type']
+    }
+    grouping = st.radio("Group by", list(groupings), horizontal=True, key="aging_grouping")
+    aging = manager.get_view('aging_report')
+    report = aging.report(groupings[grouping])
+    if report.empty:
+        st.info("No accounts to age")
+        return
+    
+    buckets = RECENCY_LABELS + [NO_PAYMENT_LABEL]
+    fig = go.Figure()
+    for bucket in buckets:
+        fig.add_trace(go.Bar(x=[' / '.join(map(str, key)) if isinstance(key, tuple) else str(key)
+                                for key in report.index],
+                             y=report[bucket], name=bucket))
+    fig.update_layout(
+        height=320,
+        barmode='stack',
+        yaxis_title="Overdue balance (R)",
+        legend=dict(orientation='h', y=-0.3),
+        margin=dict(l=20, r=20, t=30, b=20)
+    )
+    st.plotly_chart(fig, width='stretch')
+    
+    table = report.reset_index().rename(columns={
+        'subscriber_id': 'Subscriber',
+        'product_type': 'Product',
+        'accounts': 'Accounts',
+        'delinquent_accounts': 'Delinquent Accounts',
+        'balance_overdue': 'Total Overdue'
+    })
+    st.dataframe(table, width='stretch', hide_index=True)
+    
+    can_export = auth_manager.has_permission('can_export') if auth_manager else True
+    if can_export:
+        st.download_button(
+            label="Download Aging Report",
+            data=table.to_csv(index=False),
+            file_name=f"aging_report_{aging.built_on.isoformat()}.csv",
+            mime="text/csv",
+            key="aging_report_download"
+        )
+
+def _render_score_analytics(manager):
+    """Render score, band, utilization and overdue distributions from the precomputed histograms"""
+    st.subheader("Portfolio Analytics")
+    histograms = manager.get_view('portfolio_histograms')
+    concentration = histograms.overdue_concentration()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Scored Customers", f"{histograms.customers:,}".replace(",", " "))
+    with col2:
+        st.metric("Average Score", f"{histograms.mean_score():.1f}")
+    with col3:
+        st.metric("Total Overdue", f"R {concentration['overdue'].sum():,.2f}".replace(",", " "))
+    with col4:
+        # Overdue held by customers whose overdue exceeds a fifth of their balance
+        severe = concentration['overdue_share'].iloc[-2:].sum()
+        st.metric("Overdue in >20% Ratio Bands", f"{severe:.1f}%")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        scores = histograms.score_histogram()
+        fig = go.Figure(go.Bar(x=scores['bin_start'], y=scores['customers'], marker_color='#164DF2'))
+        fig.update_layout(
+            height=300,
+            title="Score distribution",
+            xaxis_title="Credit score",
+            yaxis_title="Customers",
+            bargap=0.05,
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+    with col2:
+        bands = histograms.category_histogram()
+        fig = go.Figure(go.Bar(x=bands.index, y=bands.to_numpy(), marker_color='#3DF1DF'))
+        fig.update_layout(
+            height=300,
+            title="Customers per score band",
+            xaxis_title="Band",
+            yaxis_title="Customers",
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        utilization = histograms.utilization_histogram()
+        fig = go.Figure(go.Bar(x=utilization.index, y=utilization.to_numpy(), marker_color='#164DF2'))
+        fig.update_layout(
+            height=300,
+            title="Credit utilization",
+            xaxis_title="Utilization",
+            yaxis_title="Customers",
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+    with col2:
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=concentration.index, y=concentration['customer_share'], name="Customers",
+                             marker_color='#164DF2'))
+        fig.add_trace(go.Bar(x=concentration.index, y=concentration['overdue_share'], name="Overdue amount",
+                             marker_color='#F24316'))
+        fig.update_layout(
+            height=300,
+            title="Overdue concentration by overdue ratio",
+            xaxis_title="Overdue ratio",
+            yaxis_title="Share of book (%)",
+            barmode='group',
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+
+def _render_query_builder(manager, auth_manager=None, page_size=50):
+    """Render account filters answered from the bitmap indexes, with paged results"""
+    st.subheader("Portfolio Query")
+    index = manager.get_view('bitmap_index')
+    
+    with st.form("portfolio_query_form"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            statuses = st.multiselect("Status", index.values('current_status'))
+        with col2:
+            products = st.multiselect("Product type", index.values('product_type'))
+        with col3:
+            subscribers = st.multiselect("Subscriber", index.values('subscriber_id'))
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            overdue_above = st.number_input("Overdue above (R)", min_value=0.0, value=None, step=100.0)
+        with col2:
+            utilization_above = st.number_input("Utilization above (%)", min_value=0.0, value=None, step=5.0)
+        with col3:
+            balance_above = st.number_input("Balance above (R)", min_value=0.0, value=None, step=1000.0)
+        with col4:
+            limit_below = st.number_input("Credit limit below (R)", min_value=0.0, value=None, step=1000.0)
+        submitted = st.form_submit_button("Run Query")
+    
+    if submitted:
+        st.session_state.portfolio_query = {
+            'matches': {'current_status': statuses, 'product_type': products, 'subscriber_id': subscribers},
+            'ranges': {
+                'balance_overdue': (overdue_above, None),
+                'utilization': (utilization_above, None),
+                'current_balance': (balance_above, None),
+                'credit_limit': (None, limit_below)
+            }
+        }
+        st.session_state.portfolio_query_page = 1
+    
+    query = st.session_state.get('portfolio_query')
+    if query is None:
+        return
+    
+    # Row-level security is one more bitmap; administrators see every row
+    user = auth_manager.get_current_user() if auth_manager else None
+    subscriber_ids = user.subscriber_ids if user and user.role != 'admin' else None
+    result = run_query(index, query['matches'], query['ranges'], subscriber_ids)
+    matches = index.count(result)
+    pages = max(1, -(-matches // page_size))
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.metric("Matching Accounts", f"{matches:,}".replace(",", " "))
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="portfolio_query_page")
+    st.dataframe(index.page(result, min(page, pages) - 1, page_size), width='stretch', hide_index=True)
+    st.caption(f"Page {min(page, pages)} of {pages}")
+
+def _render_balance_outlook(manager):
+    """Render the book's projected balances and when customers finish paying off their loans"""
+    st.subheader("Portfolio Balance Outlook")
+    outlook = manager.get_view('balance_outlook').outlook
+    
+    horizons = [int(column[len('balance_'):-1]) for column in outlook.columns
+                if column.startswith('balance_')]
+    cols = st.columns(len(horizons) + 1)
+    current = outlook['current_balance'].sum()
+    with cols[0]:
+        st.metric("Balance Today", f"R {current:,.0f}".replace(",", " "))
+    for col, horizon in zip(cols[1:], horizons):
+        with col:
+            projected = outlook[f'balance_{horizon}m'].sum()
+            change = (projected - current) / current * 100 if current > 0 else 0
+            st.metric(f"In {horizon} Months", f"R {projected:,.0f}".replace(",", " "), f"{change:+.1f}%")
+    
+    payoff_years = pd.to_datetime(outlook['instalment_payoff_month']).dt.year
+    counts = payoff_years.value_counts().sort_index()
+    if not counts.empty:
+        fig = go.Figure(go.Bar(x=counts.index.astype(int).astype(str), y=counts.to_numpy(), marker_color='#164DF2'))
+        fig.update_layout(
+            height=280,
+            title="Customers by year their instalment loans are paid off",
+            xaxis_title="Year",
+            yaxis_title="Customers",
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        st.plotly_chart(fig, width='stretch')
+
+def _render_stress_test(manager):
+    """Render the portfolio stress test: scenario inputs, score shift and band migration"""
+    st.subheader("Portfolio Stress Test")
+    
+    with st.form("stress_test_form"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            balance_change = st.slider("Balance change (%)", -50, 100, 15, 5)
+        with col2:
+            limit_change = st.slider("Credit limit change (%)", -50, 50, -10, 5)
+        with col3:
+            payment_delay = st.slider("Payment delay (days)", 0, 90, 30, 5)
+        with col4:
+            overdue_change = st.slider("Overdue change (%)", -50, 200, 50, 10)
+        
+        product_options = sorted(st.session_state.data['product_type'].dropna().unique().tolist())
+        product_types = st.multiselect("Shock only these products (all if empty)", product_options)
+        submitted = st.form_submit_button("Run Stress Test")
+    
+    if submitted:
+        scenario = StressScenario(
+            name="Custom scenario",
+            balance_change=balance_change / 100,
+            limit_change=limit_change / 100,
+            payment_delay_days=payment_delay,
+            overdue_change=overdue_change / 100,
+            product_types=product_types or None
+        )
+        accounts = manager.get_view('encoded_portfolio').accounts
+        st.session_state.stress_result = run_stress_test(accounts, scenario)
+    
+    result = st.session_state.get('stress_result')
+    if result is None:
+        return
+    
+    summary = result.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Customers", f"{summary['customers']:,}")
+    with col2:
+        st.metric("Mean Score", f"{summary['mean_after']:.1f}", f"{summary['mean_change']:+.1f}")
+    with col3:
+        st.metric("Downgraded", f"{summary['downgraded']:,}")
+    with col4:
+        st.metric("Upgraded", f"{summary['upgraded']:,}")
+    
+    distribution = result.distribution()
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=distribution['bin_start'], y=distribution['before'], name="Before",
+                         marker_color='#164DF2', opacity=0.6))
+    fig.add_trace(go.Bar(x=distribution['bin_start'], y=distribution['after'], name="After",
+                         marker_color='#F24316', opacity=0.6))
+    fig.update_layout(
+        barmode='overlay',
+        height=320,
+        xaxis_title="Credit score",
+        yaxis_title="Customers",
+        margin=dict(l=20, r=20, t=30, b=20)
+    )
+    st.plotly_chart(fig, width='stretch')
+    
+    st.markdown("**Category migration** (rows: before, columns: after)")
+    st.dataframe(result.migration(), width='stretch')
@@ -0,0 +1,46 @@
+# Versioned scorecard definitions.
+#
+# Each component bands one customer feature (see models.scoring.customer_features):
+#   bound='upper' -> the i-th band holds values <= edges[i] (last band: above every edge)
+#   bound='lower' -> the i-th band holds values >= edges[i-1] (first band: below every edge)
+# points has one entry per band, so len(points) == len(edges) + 1.
+# Categories band the total score the same way with bound='lower'.
+
+DEFAULT_SCORECARD = 'v1'
+
+SCORECARDS = {
+    'v1': {
+        'description': 'Original scorecard',
+        'components': [
+            {'column': 'utilization_points', 'name': 'Credit Utilization', 'feature': 'utilization',
+             'bound': 'upper', 'edges': [10, 30, 50, 75], 'points': [40, 35, 25, 15, 5]},
+            {'column': 'payment_points', 'name': 'Payment History', 'feature': 'avg_days_since_payment',
+             'bound': 'upper', 'edges': [15, 30, 45, 60], 'points': [25, 20, 15, 10, 5]},
+            {'column': 'credit_mix_points', 'name': 'Credit Mix', 'feature': 'product_types',
+             'bound': 'lower', 'edges': [2, 3, 4], 'points': [5, 10, 15, 20]},
+            {'column': 'account_age_points', 'name': 'Account Age & Activity', 'feature': 'active_products',
+             'bound': 'lower', 'edges': [2, 3, 4], 'points': [4, 6, 8, 10]},
+            {'column': 'overdue_points', 'name': 'Overdue Behavior', 'feature': 'overdue_ratio',
+             'bound': 'upper', 'edges': [0, 5, 10, 20], 'points': [5, 4, 3, 2, 1]},
+        ],
+        'categories': {'edges': [40, 60, 75, 90],
+                       'labels': ['Very Poor', 'Poor', 'Fair', 'Good', 'Excellent']},
+    },
+    'v2': {
+        'description': 'Candidate: tighter utilization bands and a 7-day grace on payment recency',
+        'components': [
+            {'column': 'utilization_points', 'name': 'Credit Utilization', 'feature': 'utilization',
+             'bound': 'upper', 'edges': [10, 25, 40, 60], 'points': [40, 35, 25, 15, 5]},
+            {'column': 'payment_points', 'name': 'Payment History', 'feature': 'avg_days_since_payment',
+             'bound': 'upper', 'edges': [22, 37, 52, 67], 'points': [25, 20, 15, 10, 5]},
+            {'column': 'credit_mix_points', 'name': 'Credit Mix', 'feature': 'product_types',
+             'bound': 'lower', 'edges': [2, 3, 4], 'points': [5, 10, 15, 20]},
+            {'column': 'account_age_points', 'name': 'Account Age & Activity', 'feature': 'active_products',
+             'bound': 'lower', 'edges': [2, 3, 4], 'points': [4, 6, 8, 10]},
+            {'column': 'overdue_points', 'name': 'Overdue Behavior', 'feature': 'overdue_ratio',
+             'bound': 'upper', 'edges': [0, 5, 10, 20], 'points': [5, 4, 3, 2, 1]},
+        ],
+        'categories': {'edges': [40, 60, 75, 90],
+                       'labels': ['Very Poor', 'Poor', 'Fair', 'Good', 'Excellent']},
+    },
+}
@@ -0,0 +1,190 @@
+import bisect
+import heapq
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.scoring import MISSING_PAYMENT_DAYS
+from models.views import DataChange, MaterializedView
+
+SUM_COLUMNS = ['credit_limit', 'current_balance', 'balance_overdue', 'monthly_instalment']
+
+
+def _day_number(value: date) -> int:
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def _contributions(rows: pd.DataFrame) -> Dict[str, Dict]:
+    """What each customer's rows add to its aggregate record"""
+    if rows.empty:
+        return {}
+    frame = pd.DataFrame({'customer_id': rows['customer_id']})
+    for column in SUM_COLUMNS:
+        frame[column] = pd.to_numeric(rows[column], errors='coerce').fillna(0)
+    active = rows['current_status'] == 'Active'
+    payment_days = pd.to_datetime(rows['last_payment_date']).to_numpy().astype('datetime64[D]')
+    has_payment = ~np.isnat(payment_days)
+    frame['rows'] = 1
+    frame['active_products'] = active.astype(int)
+    # Days since payment are kept as sums of day numbers so the average can be taken for any date
+    frame['active_payment_day_sum'] = np.where(active & has_payment, payment_days.astype(np.int64), 0)
+    frame['active_paid'] = (active & has_payment).astype(int)
+
+    sums = frame.groupby('customer_id', sort=False).sum()
+    product_types = rows.groupby(['customer_id', 'product_type'], sort=False).size()
+    subscribers = rows.groupby(['customer_id', 'subscriber_id'], sort=False).size()
+
+    records = {cid: dict(values, product_types=Counter(), subscribers=Counter())
+               for cid, values in sums.to_dict('index').items()}
+    for (cid, product_type), count in product_types.items():
+        records[cid]['product_types'][product_type] += count
+    for (cid, subscriber_id), count in subscribers.items():
+        records[cid]['subscribers'][subscriber_id] += count
+    return records
+
+
+class CustomerAggregates(MaterializedView):
+    """Per-customer totals and counts, updated by deltas whenever rows change"""
+
+    def rebuild(self, data: pd.DataFrame):
+        self.records = _contributions(data)
+
+    def apply(self, change: DataChange):
+        self._fold(_contributions(change.removed), -1)
+        self._fold(_contributions(change.added), 1)
+
+    def _fold(self, contributions: Dict[str, Dict], sign: int):
+        for cid, delta in contributions.items():
+            record = self.records.setdefault(
+                cid, dict({key: 0 for key in delta if key not in ('product_types', 'subscribers')},
+                          product_types=Counter(), subscribers=Counter()))
+            for key, value in delta.items():
+                if key in ('product_types', 'subscribers'):
+                    if sign > 0:
+                        record[key].update(value)
+                    else:
+                        record[key].subtract(value)
+                        record[key] = +record[key]  # drop zero counts
+                elif isinstance(value, float):
+                    # Amounts are currency, rounding stops float drift across many deltas
+                    record[key] = round(record[key] + sign * value, 6)
+                else:
+                    record[key] += sign * value
+            if record['rows'] <= 0:
+                del self.records[cid]
+
+    def get(self, customer_id: str, today: Optional[date] = None) -> Optional[Dict]:
+        """Aggregates of one customer, with ratios derived for the given date"""
+        record = self.records.get(customer_id)
+        if record is None:
+            return None
+        if today is None:
+            today = datetime.now().date()
+        active = record['active_products']
+        if active > 0:
+            missing = active - record['active_paid']
+            day_total = (record['active_paid'] * _day_number(today) - record['active_payment_day_sum']
+                         + missing * MISSING_PAYMENT_DAYS)
+            avg_days_since_payment = day_total / active
+        else:
+            avg_days_since_payment = MISSING_PAYMENT_DAYS
+        limit = record['credit_limit']
+        balance = record['current_balance']
+        return {
+            'rows': record['rows'],
+            'total_credit_limit': limit,
+            'total_current_balance': balance,
+            'total_overdue': record['balance_overdue'],
+            'total_monthly_instalment': record['monthly_instalment'],
+            'active_products': active,
+            'product_types': len(record['product_types']),
+            'credit_providers': len(record['subscribers']),
+            'utilization': (balance / limit * 100) if limit > 0 else 0,
+            'overdue_ratio': (record['balance_overdue'] / balance * 100) if balance > 0 else 0,
+            'avg_days_since_payment': avg_days_since_payment,
+        }
+
+
+class PortfolioTotals(MaterializedView):
+    """Book-wide and per-subscriber counts and sums, updated by deltas whenever rows change.
+
+    Distinct customers are tracked as row counts per customer, so a customer
+    leaves a total only when its last row does. The first few customer ids in
+    sorted order are kept too, and only recomputed when one of them leaves.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.subscribers: Dict = {}
+        self.customer_rows: Counter = Counter()
+        self.first: Optional[List] = None  # smallest customer ids, None until requested
+        self.first_size = 0
+        self._fold(data, 1)
+
+    def apply(self, change: DataChange):
+        self._fold(change.removed, -1)
+        self._fold(change.added, 1)
+
+    def _fold(self, rows: pd.DataFrame, sign: int):
+        if rows.empty:
+            return
+        frame = pd.DataFrame({
+            'subscriber_id': rows['subscriber_id'],
+            'customer_id': rows['customer_id'],
+            'products': 1,
+            'active_products': (rows['current_status'] == 'Active').astype(int),
+            'credit_limit': pd.to_numeric(rows['credit_limit'], errors='coerce').fillna(0),
+            'balance_overdue': pd.to_numeric(rows['balance_overdue'], errors='coerce').fillna(0),
+        })
+        per_customer = frame.groupby(['subscriber_id', 'customer_id'], dropna=False, sort=False).sum()
+        for (subscriber_id, customer_id), values in zip(per_customer.index, per_customer.to_dict('records')):
+            record = self.subscribers.setdefault(
+                subscriber_id, {'customers': Counter(), 'products': 0, 'active_products': 0,
+                                'credit_limit': 0, 'balance_overdue': 0})
+            record['customers'][customer_id] += sign * values['products']
+            if customer_id not in self.customer_rows:
+                self._customer_added(customer_id)
+            self.customer_rows[customer_id] += sign * values['products']
+            for key in ('products', 'active_products', 'credit_limit', 'balance_overdue'):
+                # Amounts are currency, rounding stops float drift across many deltas
+                record[key] = round(record[key] + sign * values[key], 6)
+            if record['customers'][customer_id] <= 0:
+                del record['customers'][customer_id]
+            if self.customer_rows[customer_id] <= 0:
+                del self.customer_rows[customer_id]
+                if self.first is not None and customer_id in self.first:
+                    self.first = None
+            if record['products'] <= 0:
+                del self.subscribers[subscriber_id]
+
+    def _customer_added(self, customer_id):
+        if self.first is not None and (len(self.first) < self.first_size or customer_id < self.first[-1]):
+            bisect.insort(self.first, customer_id)
+            del self.first[self.first_size:]
+
+    def first_customers(self, n: int) -> List:
+        """The n smallest customer ids in sorted order"""
+        if self.first is None or n > self.first_size:
+            self.first_size = max(n, self.first_size)
+            self.first = heapq.nsmallest(self.first_size, self.customer_rows)
+        return self.first[:n]
+
+    def _summary(self, records) -> Dict:
+        records = list(records)
+        return {key: sum(record[key] for record in records)
+                for key in ('products', 'active_products', 'credit_limit', 'balance_overdue')}
+
+    def totals(self) -> Dict:
+        """Customer, product and active product counts with credit limit and overdue sums of the book"""
+        return dict(self._summary(self.subscribers.values()), customers=len(self.customer_rows))
+
+    def by_subscriber(self) -> pd.DataFrame:
+        """The same totals for each subscriber; a customer counts once per subscriber holding its accounts"""
+        return pd.DataFrame([dict(self._summary([record]), customers=len(record['customers']),
+                                  subscriber_id=subscriber_id)
+                             for subscriber_id, record in self.subscribers.items()],
+                            columns=['subscriber_id', 'customers', 'products', 'active_products',
+                                     'credit_limit', 'balance_overdue']
+                            ).sort_values('subscriber_id', na_position='last').reset_index(drop=True)
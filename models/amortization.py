@@ -0,0 +1,169 @@
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.views import DataChange, MaterializedView
+
+# Highest monthly rate the annuity solver considers, 100% a month
+MAX_MONTHLY_RATE = 1.0
+RATE_ITERATIONS = 60
+# Payoffs further out than this are reported as never
+MAX_PAYOFF_MONTHS = 1200
+
+
+def solve_annuity_rate(principal, instalment, term) -> np.ndarray:
+    """Monthly rate at which term instalments repay principal, for arrays of loans.
+
+    Bisection on the present value of the instalments, which falls as the rate
+    rises; loans whose instalments do not exceed the principal get rate 0.
+    """
+    principal = np.asarray(principal, dtype=float)
+    instalment = np.asarray(instalment, dtype=float)
+    term = np.asarray(term, dtype=float)
+    low = np.zeros_like(principal)
+    high = np.full_like(principal, MAX_MONTHLY_RATE)
+    for _ in range(RATE_ITERATIONS):
+        rate = (low + high) / 2
+        present_value = instalment * (1 - (1 + rate) ** -term) / rate
+        too_low = present_value > principal  # instalments worth more than the loan: rate must rise
+        low = np.where(too_low, rate, low)
+        high = np.where(too_low, high, rate)
+    return np.where(instalment * term > principal, (low + high) / 2, 0.0)
+
+
+def balance_after(balance, rate, instalment, months) -> np.ndarray:
+    """Closed-form annuity balance after months payments, floored at zero"""
+    balance, rate, instalment = (np.asarray(x, dtype=float) for x in (balance, rate, instalment))
+    months = np.asarray(months, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = (1 + rate) ** months
+        paid = np.where(rate > 0, instalment * (growth - 1) / np.where(rate > 0, rate, 1), instalment * months)
+        remaining = balance * growth - paid
+    return np.maximum(remaining, 0.0)
+
+
+def payoff_months(balance, rate, instalment) -> np.ndarray:
+    """Payments left until the balance is cleared; inf when instalments never catch up with interest"""
+    balance, rate, instalment = (np.asarray(x, dtype=float) for x in (balance, rate, instalment))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(instalment > 0, rate * balance / instalment, np.inf)
+        compounding = -np.log1p(-np.minimum(ratio, 1 - 1e-12)) / np.log1p(np.where(rate > 0, rate, 1))
+        months = np.where(rate > 0, compounding, balance / instalment)
+    months = np.where((instalment <= 0) | (ratio >= 1), np.inf, np.ceil(months - 1e-9))
+    months = np.where(months > MAX_PAYOFF_MONTHS, np.inf, months)
+    return np.where(balance <= 0, 0.0, months)
+
+
+class _Loans:
+    """Amortization inputs of account rows; only active instalment accounts amortize"""
+
+    def __init__(self, accounts: pd.DataFrame):
+        def amounts(column):
+            return pd.to_numeric(accounts[column], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        self.balance = np.maximum(amounts('current_balance'), 0.0)
+        self.credit_limit = amounts('credit_limit')
+        instalment = amounts('monthly_instalment')
+        opening_balance = amounts('opening_balance')
+        term = amounts('loan_term')
+        self.amortizing = ((accounts['current_status'] == 'Active').to_numpy()
+                           & (opening_balance > 0) & (instalment > 0) & (term > 0))
+        self.instalment = np.where(self.amortizing, instalment, 0.0)
+        self.rate = np.where(self.amortizing, solve_annuity_rate(opening_balance, instalment, term), 0.0)
+
+    def balances(self, months) -> np.ndarray:
+        """Projected balances as a len(months) x accounts matrix; other accounts stay flat"""
+        months = np.asarray(months, dtype=float)[:, None]
+        projected = balance_after(self.balance, self.rate, self.instalment, months)
+        return np.where(self.amortizing, projected, self.balance)
+
+    def payoff_months(self) -> np.ndarray:
+        return np.where(self.amortizing, payoff_months(self.balance, self.rate, self.instalment), np.nan)
+
+
+class AmortizationSchedule:
+    """Month-by-month balances of one customer's accounts, as a months x accounts matrix"""
+
+    def __init__(self, accounts: pd.DataFrame, months: int = 60, today: Optional[date] = None):
+        today = pd.Timestamp(today or datetime.now().date())
+        loans = _Loans(accounts)
+        self.dates = pd.DatetimeIndex([today + pd.DateOffset(months=month) for month in range(months + 1)])
+        self.balances = pd.DataFrame(loans.balances(np.arange(months + 1)), index=self.dates,
+                                     columns=accounts['account_number'].astype(str).to_numpy())
+        self.credit_limit = loans.credit_limit.sum()
+
+        remaining = loans.payoff_months()
+        self.accounts = pd.DataFrame({
+            'account_number': accounts['account_number'].to_numpy(),
+            'product_type': accounts['product_type'].to_numpy(),
+            'current_balance': loans.balance,
+            'monthly_instalment': loans.instalment,
+            'annual_rate': (1 + loans.rate) ** 12 - 1,
+            'payments_left': remaining,
+            'payoff_date': [today + pd.DateOffset(months=int(m)) if np.isfinite(m) else pd.NaT for m in remaining],
+        }, index=accounts.index)
+
+    def total_balance(self) -> pd.Series:
+        return self.balances.sum(axis=1)
+
+    def utilization(self) -> pd.Series:
+        """Projected utilization in percent, on today's credit limits"""
+        if self.credit_limit <= 0:
+            return pd.Series(0.0, index=self.dates)
+        return self.total_balance() / self.credit_limit * 100
+
+
+def portfolio_outlook(data: pd.DataFrame, horizons: Sequence[int] = (12, 24, 36, 60),
+                      today: Optional[date] = None) -> pd.DataFrame:
+    """Projected balance and utilization of every customer at each horizon, in months.
+
+    Balances come from the closed-form annuity at each horizon, so the whole
+    book is projected with a few array passes instead of a schedule per
+    account.
+    """
+    today = pd.Timestamp(today or datetime.now().date())
+    loans = _Loans(data)
+    codes, customer_ids = pd.factorize(data['customer_id'], sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+
+    def per_customer(values):
+        return np.bincount(codes, weights=values[valid], minlength=len(customer_ids))
+
+    credit_limit = per_customer(loans.credit_limit)
+    outlook = pd.DataFrame({'current_balance': per_customer(loans.balance)},
+                           index=pd.Index(customer_ids, name='customer_id'))
+    for horizon, balances in zip(horizons, loans.balances(horizons)):
+        outlook[f'balance_{horizon}m'] = per_customer(balances)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            outlook[f'utilization_{horizon}m'] = np.where(credit_limit > 0,
+                                                          outlook[f'balance_{horizon}m'] / credit_limit * 100, 0.0)
+
+    # Debt-free once the last instalment account is paid off; revolving balances are not projected,
+    # so customers without amortizing loans keep NaN and get no payoff month
+    remaining = loans.payoff_months()[valid]
+    last_payoff = pd.Series(remaining).groupby(codes).max().reindex(range(len(customer_ids)), fill_value=np.nan)
+    payoff_month = np.full(len(customer_ids), np.datetime64('NaT'), dtype='datetime64[M]')
+    finite = np.isfinite(last_payoff.to_numpy())
+    payoff_month[finite] = np.datetime64(today.date(), 'M') + last_payoff.to_numpy()[finite].astype(int)
+    outlook['instalment_payoff_month'] = payoff_month
+    return outlook
+
+
+class BalanceOutlook(MaterializedView):
+    """Per-customer portfolio_outlook of the session data, reprojecting only customers that change"""
+
+    def rebuild(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        self.outlook = portfolio_outlook(data, today=self.built_on)
+
+    def apply(self, change: DataChange):
+        customer_ids = change.customer_ids
+        rows = change.data[change.data['customer_id'].isin(customer_ids)]
+        kept = self.outlook.drop(index=customer_ids, errors='ignore')
+        self.outlook = pd.concat([kept, portfolio_outlook(rows, today=self.built_on)]).sort_index()
+
+    def is_stale(self, today: date) -> bool:
+        return today != self.built_on
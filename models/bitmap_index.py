@@ -0,0 +1,119 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.views import DataChange, MaterializedView
+
+# Low-cardinality columns indexed with one bitmap per value
+BITMAP_COLUMNS = ['current_status', 'product_type', 'subscriber_id']
+# Numeric columns indexed in sorted order for range predicates; utilization is derived per account
+RANGE_COLUMNS = ['credit_limit', 'current_balance', 'balance_overdue', 'monthly_instalment', 'utilization']
+
+# Set bits in every byte value, for counting rows without unpacking bitmaps
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def account_utilization(data: pd.DataFrame) -> np.ndarray:
+    """Balance over limit per account in percent, 0 where there is no limit"""
+    limit = pd.to_numeric(data['credit_limit'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    balance = pd.to_numeric(data['current_balance'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(limit > 0, balance / limit * 100, 0.0)
+
+
+class BitmapIndex(MaterializedView):
+    """Bitmap and sorted-order indexes over the session's account rows.
+
+    Bitmaps are bit-packed, one bit per row, so predicates combine with
+    bitwise operations over n/8 bytes and never touch the columns. An edit
+    only marks the index stale; it is rebuilt on the next query.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.data = data
+        self.rows = len(data)
+        self.dirty = False
+        self.bitmaps: Dict[str, Dict] = {}
+        for column in BITMAP_COLUMNS:
+            codes, values = pd.factorize(data[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            self.bitmaps[column] = {value: self._from_positions(order[bounds[i]:bounds[i + 1]])
+                                    for i, value in enumerate(values)}
+
+        self.sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for column in RANGE_COLUMNS:
+            if column == 'utilization':
+                values = account_utilization(data)
+            else:
+                values = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)
+            order = np.argsort(values, kind='stable')  # missing values sort last and match no range
+            self.sorted[column] = (values[order], order)
+
+    def apply(self, change: DataChange):
+        self.dirty = True
+
+    def is_stale(self, today: date) -> bool:
+        return self.dirty
+
+    def _from_positions(self, positions: np.ndarray) -> np.ndarray:
+        bits = np.zeros(self.rows, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits)
+
+    def everything(self) -> np.ndarray:
+        return self._from_positions(np.arange(self.rows))
+
+    def values(self, column: str) -> List:
+        """Indexed values of a bitmap column, without missing values"""
+        return sorted(value for value in self.bitmaps[column] if pd.notna(value))
+
+    def equals(self, column: str, values: Iterable) -> np.ndarray:
+        """Rows whose column holds any of values"""
+        bitmap = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        for value in values:
+            if value in self.bitmaps[column]:
+                bitmap |= self.bitmaps[column][value]
+        return bitmap
+
+    def between(self, column: str, low: Optional[float] = None, high: Optional[float] = None,
+                include_low: bool = True, include_high: bool = True) -> np.ndarray:
+        """Rows whose numeric column lies within [low, high]; None leaves a side open"""
+        values, order = self.sorted[column]
+        start = 0 if low is None else np.searchsorted(values, low, side='left' if include_low else 'right')
+        # NaNs sort last, so an open upper end stops before them
+        stop = np.searchsorted(values, np.inf, side='right') if high is None else \
+            np.searchsorted(values, high, side='right' if include_high else 'left')
+        return self._from_positions(order[start:max(start, stop)])
+
+    def count(self, bitmap: np.ndarray) -> int:
+        return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+    def page(self, bitmap: np.ndarray, page: int, page_size: int = 50) -> pd.DataFrame:
+        """Rows of one page of the result, in session data order"""
+        positions = np.flatnonzero(np.unpackbits(bitmap, count=self.rows))
+        return self.data.iloc[positions[page * page_size:(page + 1) * page_size]]
+
+
+def run_query(index: BitmapIndex, matches: Optional[Dict[str, Sequence]] = None,
+              ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+              subscriber_ids: Optional[Sequence[str]] = None) -> np.ndarray:
+    """AND of value matches per bitmap column, numeric ranges and the caller's subscribers.
+
+    matches maps a bitmap column to accepted values (any of them), ranges a
+    range column to (low, high) with exclusive bounds, None meaning open.
+    Row-level security is one more bitmap: without subscriber_ids every row
+    passes, as for administrators.
+    """
+    bitmap = index.everything()
+    for column, values in (matches or {}).items():
+        if values:
+            bitmap &= index.equals(column, values)
+    for column, (low, high) in (ranges or {}).items():
+        if low is not None or high is not None:
+            bitmap &= index.between(column, low, high, include_low=False, include_high=False)
+    if subscriber_ids is not None:
+        bitmap &= index.equals('subscriber_id', subscriber_ids)
+    return bitmap
@@ -0,0 +1,75 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+import pandas as pd
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache shared by every session in the process"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._key_tags: Dict[Hashable, Hashable] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, tag: Optional[Hashable] = None):
+        """Store value; entries sharing a tag can later be dropped together"""
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = value
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+                self._key_tags[key] = tag
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tag: Hashable):
+        """Drop every entry stored under tag"""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key: Hashable):
+        self._entries.pop(key, None)
+        tag = self._key_tags.pop(key, None)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def customer_fingerprint(customer_data: pd.DataFrame) -> str:
+    """Cheap content hash of a customer's rows, stable across sessions and replicas"""
+    row_hashes = pd.util.hash_pandas_object(customer_data, index=False).to_numpy()
+    columns = ','.join(map(str, customer_data.columns)).encode()
+    return hashlib.blake2b(row_hashes.tobytes() + columns, digest_size=16).hexdigest()
+
+
+# Scores and component breakdowns keyed by (customer_id, fingerprint, scoring date)
+score_cache = LRUCache(maxsize=4096)
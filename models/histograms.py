@@ -0,0 +1,116 @@
+from datetime import date, datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import get_scorecard
+from models.scoring import score_portfolio
+from models.views import DataChange, MaterializedView
+
+SCORE_BIN_WIDTH = 5
+# Inclusive upper edges of the utilization and overdue-ratio bins, in percent; a last bin holds larger values
+UTILIZATION_EDGES = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 125, 150)
+OVERDUE_RATIO_EDGES = (0, 5, 10, 20, 50)
+BIN_COLUMNS = ['score', 'category', 'utilization', 'overdue_ratio', 'overdue']
+
+
+def _edge_labels(edges) -> List[str]:
+    labels = [f"≤{edges[0]}%"] + [f"{low}-{high}%" for low, high in zip(edges, edges[1:])]
+    return labels + [f">{edges[-1]}%"]
+
+
+UTILIZATION_LABELS = _edge_labels(UTILIZATION_EDGES)
+OVERDUE_RATIO_LABELS = ["None"] + _edge_labels(OVERDUE_RATIO_EDGES)[1:]
+
+
+class PortfolioHistograms(MaterializedView):
+    """Binned score, category, utilization and overdue counts of the whole book.
+
+    Every customer's bins are computed by the vectorized batch scorer and kept,
+    so an edit only moves the customers it touches between bins. Reading the
+    histograms costs the number of bins, not the number of customers; scores
+    depend on the date, so the view is rebuilt each day.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        scorecard = get_scorecard()
+        self.categories = scorecard.categories.points.tolist()
+        self.score_counts = np.zeros(scorecard.max_score // SCORE_BIN_WIDTH + 1, dtype=np.int64)
+        self.category_counts = np.zeros(len(self.categories), dtype=np.int64)
+        self.utilization_counts = np.zeros(len(UTILIZATION_LABELS), dtype=np.int64)
+        self.overdue_counts = np.zeros(len(OVERDUE_RATIO_LABELS), dtype=np.int64)
+        self.overdue_amounts = np.zeros(len(OVERDUE_RATIO_LABELS))
+        self.score_total = 0
+        self.bins: Dict[str, tuple] = {}  # customer_id -> one BIN_COLUMNS tuple
+        self._add(data)
+
+    def _binned(self, rows: pd.DataFrame) -> pd.DataFrame:
+        scorecard = get_scorecard()
+        scores = score_portfolio(rows, today=self.built_on, scorecard=scorecard)
+        return pd.DataFrame({
+            'score': scores['total_score'].astype(np.int64),
+            'category': scorecard.categories.band(scores['total_score'].to_numpy()),
+            'utilization': np.searchsorted(UTILIZATION_EDGES, scores['utilization'].to_numpy(), side='left'),
+            'overdue_ratio': np.searchsorted(OVERDUE_RATIO_EDGES, scores['overdue_ratio'].to_numpy(), side='left'),
+            'overdue': scores['total_overdue'],
+        }, index=scores.index)
+
+    def _fold(self, binned: pd.DataFrame, sign: int):
+        scores = binned['score'].to_numpy()
+        self.score_counts += sign * np.bincount(scores // SCORE_BIN_WIDTH, minlength=len(self.score_counts))
+        self.category_counts += sign * np.bincount(binned['category'], minlength=len(self.category_counts))
+        self.utilization_counts += sign * np.bincount(binned['utilization'], minlength=len(self.utilization_counts))
+        overdue_bins = binned['overdue_ratio'].to_numpy()
+        self.overdue_counts += sign * np.bincount(overdue_bins, minlength=len(self.overdue_counts))
+        amounts = np.bincount(overdue_bins, weights=binned['overdue'].to_numpy(), minlength=len(self.overdue_amounts))
+        # Amounts are currency, rounding stops float drift across many deltas
+        self.overdue_amounts = np.round(self.overdue_amounts + sign * amounts, 6)
+        self.score_total += sign * int(scores.sum())
+
+    def _add(self, rows: pd.DataFrame):
+        if rows.empty:
+            return
+        binned = self._binned(rows)
+        self._fold(binned, 1)
+        self.bins.update(zip(binned.index, binned.itertuples(index=False, name=None)))
+
+    def apply(self, change: DataChange):
+        customer_ids = change.customer_ids
+        previous = [self.bins.pop(customer_id) for customer_id in customer_ids if customer_id in self.bins]
+        if previous:
+            self._fold(pd.DataFrame(previous, columns=BIN_COLUMNS), -1)
+        self._add(change.data[change.data['customer_id'].isin(customer_ids)])
+
+    def is_stale(self, today: date) -> bool:
+        return today != self.built_on
+
+    @property
+    def customers(self) -> int:
+        return int(self.category_counts.sum())
+
+    def mean_score(self) -> float:
+        return self.score_total / self.customers if self.customers else 0.0
+
+    def score_histogram(self) -> pd.DataFrame:
+        """Customers per score bin, labelled by the bin's lowest score"""
+        return pd.DataFrame({'bin_start': np.arange(len(self.score_counts)) * SCORE_BIN_WIDTH,
+                             'customers': self.score_counts})
+
+    def category_histogram(self) -> pd.Series:
+        return pd.Series(self.category_counts, index=self.categories, name='customers')
+
+    def utilization_histogram(self) -> pd.Series:
+        return pd.Series(self.utilization_counts, index=UTILIZATION_LABELS, name='customers')
+
+    def overdue_concentration(self) -> pd.DataFrame:
+        """Share of customers and of the book's overdue amount in each overdue-ratio band"""
+        customers = max(self.customers, 1)
+        overdue = self.overdue_amounts.sum()
+        return pd.DataFrame({
+            'customers': self.overdue_counts,
+            'overdue': self.overdue_amounts,
+            'customer_share': self.overdue_counts / customers * 100,
+            'overdue_share': self.overdue_amounts / overdue * 100 if overdue > 0 else np.zeros(len(self.overdue_amounts)),
+        }, index=pd.Index(OVERDUE_RATIO_LABELS, name='overdue_ratio'))
@@ -0,0 +1,90 @@
+import os
+import re
+import threading
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.cache import LRUCache
+from models.scorecard import get_scorecard
+from models.store import DATA_DIR, atomic_write
+
+HISTORY_DIR = os.path.join(DATA_DIR, 'history')
+
+_SEGMENT_NAME = re.compile(r'^(\d{4}-\d{2}-\d{2})\.npz$')
+
+
+def history_columns() -> List[str]:
+    """Score columns kept per customer per snapshot"""
+    return ['total_score'] + [component['column'] for component in get_scorecard().components]
+
+
+class ScoreHistory:
+    """Append-only score history with one compressed columnar segment per snapshot date.
+
+    Each segment stores the customer ids sorted, which doubles as its customer
+    index, plus one small-integer array per score column. A segment is only
+    rewritten when its snapshot is explicitly rescored, so decoded segments
+    are cached per file version and shared by every session.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR, cached_segments: int = 32):
+        self.directory = directory
+        self._segments = LRUCache(maxsize=cached_segments)
+        self._lock = threading.Lock()
+
+    def _segment_path(self, snapshot_date: date) -> str:
+        return os.path.join(self.directory, f'{snapshot_date.isoformat()}.npz')
+
+    def snapshot_dates(self) -> List[date]:
+        if not os.path.isdir(self.directory):
+            return []
+        dates = [date.fromisoformat(match.group(1))
+                 for match in map(_SEGMENT_NAME.match, os.listdir(self.directory)) if match]
+        return sorted(dates)
+
+    def append(self, snapshot_date: date, scores: pd.DataFrame, replace: bool = False) -> bool:
+        """Add a snapshot indexed by customer_id; an existing date is left untouched unless replace"""
+        path = self._segment_path(snapshot_date)
+        with self._lock:
+            if os.path.exists(path) and not replace:
+                return False
+            scores = scores.sort_index()
+            arrays = {'customer_id': scores.index.to_numpy().astype(str)}
+            for column in history_columns():
+                arrays[column] = scores[column].to_numpy().astype(np.int16)
+            atomic_write(path, lambda f: np.savez_compressed(f, **arrays), mode='wb')
+            self._segments.invalidate(snapshot_date)
+        return True
+
+    def _load_segment(self, snapshot_date: date) -> Dict[str, np.ndarray]:
+        path = self._segment_path(snapshot_date)
+        # The file's mtime tells processes apart from a rescored segment written by another one
+        key = (snapshot_date, os.stat(path).st_mtime_ns)
+        segment = self._segments.get(key)
+        if segment is None:
+            with np.load(path) as stored:
+                segment = {name: stored[name] for name in stored.files}
+            self._segments.invalidate(snapshot_date)
+            self._segments.put(key, segment, tag=snapshot_date)
+        return segment
+
+    def customer_history(self, customer_id: str, start: Optional[date] = None,
+                         end: Optional[date] = None) -> pd.DataFrame:
+        """Scores of one customer for every snapshot date in [start, end]"""
+        rows = []
+        for snapshot_date in self.snapshot_dates():
+            if (start and snapshot_date < start) or (end and snapshot_date > end):
+                continue
+            segment = self._load_segment(snapshot_date)
+            ids = segment['customer_id']
+            position = np.searchsorted(ids, customer_id)
+            if position < len(ids) and ids[position] == customer_id:
+                row = {'date': pd.Timestamp(snapshot_date)}
+                for column in history_columns():
+                    if column in segment:
+                        row[column] = int(segment[column][position])
+                rows.append(row)
+        return pd.DataFrame(rows, columns=['date'] + history_columns())
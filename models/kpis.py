@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.cache import score_cache
+
+
+def subscriber_kpis(data: pd.DataFrame) -> pd.DataFrame:
+    """Exposure, utilization, overdue ratio and status mix of every subscriber in data.
+
+    Totals and status shares come from one grouped aggregation, so a
+    subscriber's row depends on its own partition only. Average scores are
+    not included: a customer's score spans every subscriber it banks with
+    (see ScoreRanks.subscriber_mean).
+    """
+    rows = data[data['subscriber_id'].notna()]
+    frame = pd.DataFrame({
+        'subscriber_id': rows['subscriber_id'],
+        'customer_id': rows['customer_id'],
+        'credit_limit': pd.to_numeric(rows['credit_limit'], errors='coerce').fillna(0),
+        'exposure': pd.to_numeric(rows['current_balance'], errors='coerce').fillna(0),
+        'overdue': pd.to_numeric(rows['balance_overdue'], errors='coerce').fillna(0),
+    })
+    statuses = sorted(rows['current_status'].dropna().unique())
+    for status in statuses:
+        frame[f'status_{status}'] = (rows['current_status'] == status) * 100.0
+
+    kpis = frame.groupby('subscriber_id').agg(
+        customers=('customer_id', 'nunique'),
+        accounts=('customer_id', 'size'),
+        credit_limit=('credit_limit', 'sum'),
+        exposure=('exposure', 'sum'),
+        overdue=('overdue', 'sum'),
+        **{f'status_{status}': (f'status_{status}', 'mean') for status in statuses}
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kpis['utilization'] = np.where(kpis['credit_limit'] > 0, kpis['exposure'] / kpis['credit_limit'] * 100, 0.0)
+        kpis['overdue_ratio'] = np.where(kpis['exposure'] > 0, kpis['overdue'] / kpis['exposure'] * 100, 0.0)
+    return kpis
+
+
+def cached_subscriber_kpis(data: pd.DataFrame, subscriber_ids: List[str],
+                           versions: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """subscriber_kpis of the given subscribers, reusing rows cached for each partition version.
+
+    versions are the store's namespace versions (see models.store); only
+    partitions whose subscriber:<id> version has no cached row are recomputed,
+    in a single pass. Without versions nothing is cached.
+    """
+    keys = {}
+    if versions is not None:
+        keys = {subscriber_id: ('subscriber_kpis', subscriber_id, versions.get(f'subscriber:{subscriber_id}', 0))
+                for subscriber_id in subscriber_ids}
+    rows = {subscriber_id: score_cache.get(keys[subscriber_id]) if keys else None for subscriber_id in subscriber_ids}
+
+    stale = [subscriber_id for subscriber_id, row in rows.items() if row is None]
+    if stale:
+        fresh = subscriber_kpis(data[data['subscriber_id'].isin(stale)])
+        for subscriber_id in stale:
+            if subscriber_id not in fresh.index:
+                continue
+            rows[subscriber_id] = fresh.loc[subscriber_id].to_dict()
+            if keys:
+                score_cache.put(keys[subscriber_id], rows[subscriber_id])
+
+    found = {subscriber_id: row for subscriber_id, row in rows.items() if row is not None}
+    kpis = pd.DataFrame.from_dict(found, orient='index')
+    status_columns = sorted(column for column in kpis.columns if column.startswith('status_'))
+    kpis[status_columns] = kpis[status_columns].fillna(0.0)
+    kpis.index.name = 'subscriber_id'
+    return kpis[[column for column in kpis.columns if not column.startswith('status_')] + status_columns]
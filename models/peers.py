@@ -0,0 +1,111 @@
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import get_scorecard
+from models.scoring import customer_features
+from models.views import DataChange, MaterializedView
+
+PEER_FEATURES = ['log_credit_limit', 'utilization', 'product_types', 'active_products', 'account_age_months']
+
+
+def peer_features(data: pd.DataFrame, today: date) -> pd.DataFrame:
+    """Per-customer comparison vector and current score, from the scoring aggregates plus account age"""
+    features = customer_features(data, today)
+    scores = get_scorecard().score(features)
+    opened = pd.to_datetime(data['opening_date'])
+    age_months = (pd.Timestamp(today) - opened).dt.days / 30.4375
+    account_age = age_months.groupby(data['customer_id']).mean()
+    return pd.DataFrame({
+        'log_credit_limit': np.log1p(features['total_credit_limit'].clip(lower=0)),
+        # Utilization above 150% is equally bad, capping it keeps outliers from dominating distances
+        'utilization': features['utilization'].clip(upper=150),
+        'product_types': features['product_types'],
+        'active_products': features['active_products'],
+        'account_age_months': account_age.reindex(features.index).fillna(0),
+        'total_credit_limit': features['total_credit_limit'],
+        'score': scores['total_score'],
+    }, index=features.index)
+
+
+class PeerIndex(MaterializedView):
+    """Brute-force nearest-neighbour index over standardized customer feature vectors.
+
+    Vectors live in one float32 matrix, so a query is a single vectorized
+    distance pass plus argpartition. Edits rewrite, append or swap-remove
+    only the rows of the customers they touch; the standardization fitted at
+    build time is kept until the next daily rebuild.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        features = peer_features(data, self.built_on)
+        values = features[PEER_FEATURES].to_numpy(dtype=float)
+        self.center = values.mean(axis=0) if len(values) else np.zeros(len(PEER_FEATURES))
+        scale = values.std(axis=0) if len(values) else np.ones(len(PEER_FEATURES))
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.vectors = self._standardize(values)
+        self.customer_ids = features.index.to_list()
+        self.positions = {customer_id: i for i, customer_id in enumerate(self.customer_ids)}
+        self.details = features.drop(columns=PEER_FEATURES[:1]).reset_index(drop=True)
+
+    def _standardize(self, values: np.ndarray) -> np.ndarray:
+        return ((values - self.center) / self.scale).astype(np.float32)
+
+    def _remove(self, customer_id: str):
+        """Swap the last row into the removed customer's slot"""
+        position = self.positions.pop(customer_id)
+        last = len(self.customer_ids) - 1
+        if position != last:
+            moved = self.customer_ids[last]
+            self.vectors[position] = self.vectors[last]
+            self.details.iloc[position] = self.details.iloc[last]
+            self.customer_ids[position] = moved
+            self.positions[moved] = position
+        self.vectors = self.vectors[:last]
+        self.details = self.details.iloc[:last]
+        self.customer_ids.pop()
+
+    def apply(self, change: DataChange):
+        customer_ids = change.customer_ids
+        rows = change.data[change.data['customer_id'].isin(customer_ids)]
+        features = peer_features(rows, self.built_on) if not rows.empty else None
+        for customer_id in customer_ids:
+            if features is None or customer_id not in features.index:
+                if customer_id in self.positions:
+                    self._remove(customer_id)
+                continue
+            vector = self._standardize(features.loc[[customer_id], PEER_FEATURES].to_numpy(dtype=float))
+            detail = features.loc[customer_id].drop(PEER_FEATURES[:1])
+            position = self.positions.get(customer_id)
+            if position is None:
+                position = len(self.customer_ids)
+                self.positions[customer_id] = position
+                self.customer_ids.append(customer_id)
+                self.vectors = np.vstack([self.vectors, vector])
+                self.details = pd.concat([self.details, detail.to_frame().T], ignore_index=True)
+            else:
+                self.vectors[position] = vector[0]
+                self.details.iloc[position] = detail
+
+    def is_stale(self, today: date) -> bool:
+        return today != self.built_on
+
+    def nearest(self, customer_id: str, k: int = 20) -> Optional[pd.DataFrame]:
+        """The k customers closest to customer_id, nearest first, with their scores"""
+        position = self.positions.get(customer_id)
+        if position is None:
+            return None
+        distances = np.sqrt(((self.vectors - self.vectors[position]) ** 2).sum(axis=1))
+        distances[position] = np.inf
+        k = min(k, len(distances) - 1)
+        if k <= 0:
+            return self.details.iloc[0:0].assign(customer_id=[], distance=[])
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        peers = self.details.iloc[nearest].copy()
+        peers.insert(0, 'customer_id', [self.customer_ids[i] for i in nearest])
+        peers.insert(1, 'distance', distances[nearest])
+        return peers.reset_index(drop=True)
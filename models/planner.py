@@ -0,0 +1,152 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import CompiledScorecard, get_scorecard
+from models.scoring import MISSING_PAYMENT_DAYS
+
+# Rand-equivalent effort of opening and running one more product, used to weigh
+# new accounts against paying balances down
+NEW_ACCOUNT_EFFORT = 5000.0
+
+
+class ImprovementPlan:
+    """Cheapest combination of account-level actions found for a target score"""
+
+    def __init__(self, target: int, current: Dict, planned: Dict, paydown: float,
+                 catch_up: List[Dict], new_accounts: int, effort: float):
+        self.target = target
+        self.current = current  # points per component column plus total_score, today
+        self.planned = planned  # the same after the plan
+        self.paydown = paydown  # rands paid off balances, overdue amounts first
+        self.catch_up = catch_up  # active accounts to bring up to date, most overdue first
+        self.new_accounts = new_accounts  # products of new types to open
+        self.effort = effort
+
+    @property
+    def score(self) -> int:
+        return self.planned['total_score']
+
+    @property
+    def reachable(self) -> bool:
+        return self.score >= self.target
+
+    def gains(self, scorecard: Optional[CompiledScorecard] = None) -> List[Dict]:
+        """Components whose points the plan raises, largest gain first"""
+        gains = []
+        for component in (scorecard or get_scorecard()).components:
+            column = component['column']
+            if self.planned[column] > self.current[column]:
+                gains.append({
+                    'name': component['name'],
+                    'current_points': self.current[column],
+                    'planned_points': self.planned[column],
+                    'max_points': component['max_points'],
+                })
+        return sorted(gains, key=lambda gain: gain['planned_points'] - gain['current_points'], reverse=True)
+
+
+class _CustomerState:
+    """Account totals of one customer that the plan actions change"""
+
+    def __init__(self, accounts: pd.DataFrame, today: date):
+        def amounts(column):
+            return pd.to_numeric(accounts[column], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        self.credit_limit = amounts('credit_limit').sum()
+        self.balance = amounts('current_balance').sum()
+        self.overdue = amounts('balance_overdue').sum()
+        self.product_types = accounts['product_type'].nunique()
+
+        active = accounts[accounts['current_status'] == 'Active']
+        payment_dates = pd.to_datetime(active['last_payment_date'])
+        days = (pd.Timestamp(today) - payment_dates).dt.days.fillna(MISSING_PAYMENT_DAYS).to_numpy(dtype=float)
+        # Catching up the most overdue accounts first lowers the average fastest
+        order = np.argsort(-days, kind='stable')
+        self.active_accounts = active.iloc[order]
+        self.active_days = days[order]
+        self.catch_up_cost = pd.to_numeric(self.active_accounts['monthly_instalment'], errors='coerce') \
+            .fillna(0).to_numpy(dtype=float)
+
+    def features(self, paydown: float, caught_up: int, new_accounts: int) -> Dict:
+        """Scoring features after paying down, catching up and opening accounts"""
+        balance = max(self.balance - paydown, 0.0)
+        overdue = max(self.overdue - paydown, 0.0)
+        active_products = len(self.active_days) + new_accounts
+        # Caught-up and newly opened accounts were paid today
+        days_total = self.active_days[caught_up:].sum()
+        return {
+            'utilization': balance / self.credit_limit * 100 if self.credit_limit > 0 else 0,
+            'overdue_ratio': overdue / balance * 100 if balance > 0 else 0,
+            'avg_days_since_payment': days_total / active_products if active_products > 0 else MISSING_PAYMENT_DAYS,
+            'product_types': self.product_types + new_accounts,
+            'active_products': active_products,
+        }
+
+    def paydown_options(self, scorecard: CompiledScorecard) -> List[float]:
+        """Smallest paydown reaching each utilization and overdue band edge"""
+        options = {0.0}
+        for component in scorecard.components:
+            for edge in component['table'].edges:
+                if component['feature'] == 'utilization' and self.credit_limit > 0:
+                    options.add(self.balance - edge / 100 * self.credit_limit)
+                elif component['feature'] == 'overdue_ratio':
+                    ratio = edge / 100
+                    # (O - T) / (B - T) <= r  <=>  T >= (O - rB) / (1 - r), paying overdue first
+                    options.add((self.overdue - ratio * self.balance) / (1 - ratio) if ratio < 1 else 0.0)
+        return sorted({float(np.ceil(min(max(option, 0.0), self.balance))) for option in options})
+
+    def new_account_options(self, scorecard: CompiledScorecard) -> range:
+        """New account counts up to the last product-type or active-product band edge.
+
+        Every count is tried, not only the edges, because a fresh account also
+        lowers the average days since payment.
+        """
+        current = {'product_types': self.product_types, 'active_products': len(self.active_days)}
+        most = 0
+        for component in scorecard.components:
+            if component['feature'] in current:
+                for edge in component['table'].edges:
+                    most = max(most, int(np.ceil(edge)) - current[component['feature']])
+        return range(most + 1)
+
+
+def solve_target(accounts: pd.DataFrame, target: int, today: Optional[date] = None,
+                 scorecard: Optional[CompiledScorecard] = None,
+                 new_account_effort: float = NEW_ACCOUNT_EFFORT) -> ImprovementPlan:
+    """Lowest-effort account actions that lift a customer's score to target.
+
+    Scores only change at band edges, so the search runs over the paydown
+    reaching each utilization and overdue edge, the number of new accounts,
+    and how many of the most overdue active accounts to bring up to date.
+    Effort is rands paid (paydown plus catch-up instalments) plus
+    new_account_effort per new account. When the target is out of reach the
+    highest-scoring plan is returned instead.
+    """
+    scorecard = scorecard or get_scorecard()
+    today = today or datetime.now().date()
+    state = _CustomerState(accounts, today)
+    current = scorecard.score_one(state.features(0.0, 0, 0))
+
+    best = None
+    catch_up_costs = np.concatenate([[0.0], np.cumsum(state.catch_up_cost)])
+    for new_accounts in state.new_account_options(scorecard):
+        for paydown in state.paydown_options(scorecard):
+            for caught_up in range(len(state.active_days) + 1):
+                planned = scorecard.score_one(state.features(paydown, caught_up, new_accounts))
+                effort = paydown + catch_up_costs[caught_up] + new_accounts * new_account_effort
+                # Reaching the target beats everything, then least effort; short of it, highest score
+                rank = (min(planned['total_score'], target), -effort)
+                if best is None or rank > best[0]:
+                    best = (rank, planned, paydown, caught_up, new_accounts, effort)
+
+    _, planned, paydown, caught_up, new_accounts, effort = best
+    catch_up = [
+        {'account_number': account['account_number'], 'product_type': account['product_type'],
+         'days_since_payment': int(days), 'instalment': float(cost)}
+        for (_, account), days, cost in zip(state.active_accounts.iloc[:caught_up].iterrows(),
+                                            state.active_days[:caught_up], state.catch_up_cost[:caught_up])
+    ]
+    return ImprovementPlan(target, current, planned, paydown, catch_up, new_accounts, float(effort))
@@ -0,0 +1,87 @@
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import CompiledScorecard, get_scorecard
+from models.scoring import MISSING_PAYMENT_DAYS
+
+# Monthly chance of missing a payment grows with how late the account is today
+MIN_MISS_RATE = 0.02
+MAX_MISS_RATE = 0.5
+MISS_RATE_DAYS = 120  # days since payment at which an account misses half its payments
+
+FAN_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def project_scores(accounts: pd.DataFrame, months: int = 12, paths: int = 2000,
+                   today: Optional[date] = None, scorecard: Optional[CompiledScorecard] = None,
+                   seed: Optional[int] = None, percentiles: Sequence[int] = FAN_PERCENTILES) -> pd.DataFrame:
+    """Monte Carlo score outlook of one customer as percentile bands per month.
+
+    Every path evolves all accounts at once as (paths, accounts) arrays. Each
+    month an active account either pays its monthly_instalment, which settles
+    overdue amounts first and runs the balance down, or misses it, adding the
+    instalment to the overdue amount and 30 days to the time since payment.
+    Paths are scored with the scorecard's vectorized band lookups.
+    """
+    scorecard = scorecard or get_scorecard()
+    today = pd.Timestamp(today or datetime.now().date())
+    rng = np.random.default_rng(seed)
+
+    def amounts(column):
+        return pd.to_numeric(accounts[column], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    credit_limit = amounts('credit_limit').sum()
+    instalment = amounts('monthly_instalment')
+    active = (accounts['current_status'] == 'Active').to_numpy()
+    days = (today - pd.to_datetime(accounts['last_payment_date'])).dt.days \
+        .fillna(MISSING_PAYMENT_DAYS).to_numpy(dtype=float)
+    elapsed = ((today - pd.to_datetime(accounts['opening_date'])).dt.days / 30.4375).fillna(0).to_numpy()
+    remaining_term = amounts('loan_term') - elapsed
+    miss_rate = np.clip(days / MISS_RATE_DAYS * 0.5, MIN_MISS_RATE, MAX_MISS_RATE)
+
+    shape = (paths, len(accounts))
+    balance = np.broadcast_to(amounts('current_balance'), shape).copy()
+    overdue = np.broadcast_to(amounts('balance_overdue'), shape).copy()
+    days = np.broadcast_to(days, shape).copy()
+    active_products = active.sum()
+
+    features = {name: np.empty((months + 1, paths)) for name in ('utilization', 'overdue_ratio',
+                                                                 'avg_days_since_payment')}
+
+    def record(month):
+        total_balance = balance.sum(axis=1)
+        total_overdue = overdue.sum(axis=1)
+        features['utilization'][month] = total_balance / credit_limit * 100 if credit_limit > 0 else 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features['overdue_ratio'][month] = np.where(total_balance > 0, total_overdue / total_balance * 100, 0)
+        features['avg_days_since_payment'][month] = (
+            days[:, active].sum(axis=1) / active_products if active_products else MISSING_PAYMENT_DAYS)
+
+    record(0)
+    for month in range(1, months + 1):
+        # Instalments fall due until the term ends, and after it while a balance remains
+        paying = active & ((remaining_term >= month) | (balance > 0))
+        missed = paying & (rng.random(shape) < miss_rate)
+        paid = paying & ~missed
+        payment = np.where(paid, np.minimum(instalment, balance), 0.0)
+        balance -= payment
+        overdue = np.minimum(np.maximum(overdue - payment, 0) + np.where(missed, instalment, 0), balance)
+        # A payment lands somewhere in the month; a miss adds the month to the time since payment
+        days = np.where(paid, rng.uniform(0, 30, shape), np.where(missed, days + 30, days))
+        record(month)
+
+    scores = np.zeros((months + 1, paths), dtype=int)
+    static = {'product_types': accounts['product_type'].nunique(), 'active_products': active_products}
+    for component in scorecard.components:
+        values = features.get(component['feature'])
+        if values is None:
+            values = np.full((months + 1, paths), static[component['feature']])
+        scores += component['table'].lookup(values.ravel()).reshape(values.shape)
+
+    bands = np.percentile(scores, percentiles, axis=1)
+    projection = pd.DataFrame({f'p{p}': band for p, band in zip(percentiles, bands)})
+    projection.insert(0, 'date', [today + pd.DateOffset(months=month) for month in range(months + 1)])
+    return projection
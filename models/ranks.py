@@ -0,0 +1,103 @@
+from datetime import date, datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.scoring import score_portfolio
+from models.views import DataChange, MaterializedView
+
+
+def _insert(scores: np.ndarray, score: int) -> np.ndarray:
+    return np.insert(scores, np.searchsorted(scores, score), score)
+
+
+def _remove(scores: np.ndarray, score: int) -> np.ndarray:
+    return np.delete(scores, np.searchsorted(scores, score))
+
+
+def percentile_of(scores: np.ndarray, score: int) -> float:
+    """Percentile of score within sorted scores, counting ties as half below"""
+    if len(scores) == 0:
+        return 0.0
+    below = np.searchsorted(scores, score, side='left')
+    at_or_below = np.searchsorted(scores, score, side='right')
+    return float((below + at_or_below) / 2 / len(scores) * 100)
+
+
+class ScoreRanks(MaterializedView):
+    """Sorted arrays of current scores for the portfolio and each subscriber.
+
+    Edits rescore only the customers they touch and move those scores within
+    the sorted arrays, so a rank is two binary searches. Scores depend on the
+    date through payment recency, so the view is rebuilt each day.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        self.scores = {}  # customer_id -> total score
+        self.subscribers = {}  # customer_id -> subscriber ids holding its accounts
+        self.portfolio = np.array([], dtype=int)
+        self.by_subscriber = {}
+        self._add(data)
+
+    def _add(self, rows: pd.DataFrame):
+        """Score the customers in rows and insert them; none of them may be present"""
+        if rows.empty:
+            return
+        scores = score_portfolio(rows, today=self.built_on)['total_score'].astype(int)
+        pairs = rows[['customer_id', 'subscriber_id']].dropna().drop_duplicates()
+        pairs['score'] = pairs['customer_id'].map(scores)
+        self.scores.update(scores.to_dict())
+        for customer_id in scores.index:
+            self.subscribers[customer_id] = set()
+        for customer_id, subscriber_id in zip(pairs['customer_id'], pairs['subscriber_id']):
+            self.subscribers[customer_id].add(subscriber_id)
+
+        if len(scores) > len(self.portfolio):
+            # Bulk load: sort once instead of inserting one by one
+            self.portfolio = np.sort(np.concatenate([self.portfolio, scores.to_numpy()]))
+            for subscriber_id, members in pairs.groupby('subscriber_id')['score']:
+                current = self.by_subscriber.get(subscriber_id, np.array([], dtype=int))
+                self.by_subscriber[subscriber_id] = np.sort(np.concatenate([current, members.to_numpy(dtype=int)]))
+        else:
+            for customer_id, score in scores.items():
+                self.portfolio = _insert(self.portfolio, score)
+                for subscriber_id in self.subscribers[customer_id]:
+                    current = self.by_subscriber.get(subscriber_id, np.array([], dtype=int))
+                    self.by_subscriber[subscriber_id] = _insert(current, score)
+
+    def _discard(self, customer_id: str):
+        score = self.scores.pop(customer_id, None)
+        if score is None:
+            return
+        self.portfolio = _remove(self.portfolio, score)
+        for subscriber_id in self.subscribers.pop(customer_id):
+            self.by_subscriber[subscriber_id] = _remove(self.by_subscriber[subscriber_id], score)
+
+    def apply(self, change: DataChange):
+        customer_ids = change.customer_ids
+        for customer_id in customer_ids:
+            self._discard(customer_id)
+        self._add(change.data[change.data['customer_id'].isin(customer_ids)])
+
+    def is_stale(self, today: date) -> bool:
+        return today != self.built_on
+
+    def subscriber_mean(self, subscriber_id: str) -> float:
+        """Mean score of the customers holding accounts at a subscriber, NaN if there are none"""
+        scores = self.by_subscriber.get(subscriber_id)
+        return float(scores.mean()) if scores is not None and len(scores) else float('nan')
+
+    def get(self, customer_id: str) -> Optional[Dict]:
+        """Score and percentiles of one customer in the portfolio and each of its subscribers"""
+        score = self.scores.get(customer_id)
+        if score is None:
+            return None
+        return {
+            'score': score,
+            'portfolio': percentile_of(self.portfolio, score),
+            'portfolio_size': len(self.portfolio),
+            'subscribers': {subscriber_id: percentile_of(self.by_subscriber[subscriber_id], score)
+                            for subscriber_id in sorted(self.subscribers[customer_id])},
+        }
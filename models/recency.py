@@ -0,0 +1,122 @@
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.cache import customer_fingerprint, score_cache
+from models.scoring import MISSING_PAYMENT_DAYS
+from models.views import DataChange, MaterializedView
+
+# Inclusive upper edges, in days since payment, of every recency bucket but the last
+RECENCY_EDGES = (30, 60, 90)
+RECENCY_LABELS = ["0-30 days", "31-60 days", "61-90 days", "90+ days"]
+NO_PAYMENT_LABEL = "No payment"
+
+
+def days_since(dates, today: Optional[date] = None) -> np.ndarray:
+    """Whole days from each date to today as floats, NaN where the date is missing"""
+    today = np.datetime64(pd.Timestamp(today or datetime.now().date()).date(), 'D')
+    days_at = np.asarray(pd.to_datetime(dates), dtype='datetime64[D]')
+    missing = np.isnat(days_at)
+    days = (today - np.where(missing, today, days_at)).astype(float)
+    days[missing] = np.nan
+    return days
+
+
+def recency_buckets(days: np.ndarray) -> np.ndarray:
+    """Index into RECENCY_LABELS of each day count, len(RECENCY_LABELS) where the count is missing"""
+    buckets = np.digitize(days, RECENCY_EDGES, right=True)
+    return np.where(np.isnan(days), len(RECENCY_LABELS), buckets)
+
+
+class PaymentRecency:
+    """Days since last payment of a set of accounts, with its buckets and counts, computed once as arrays"""
+
+    def __init__(self, accounts: pd.DataFrame, today: Optional[date] = None):
+        self.days = days_since(accounts['last_payment_date'], today)
+        self.active = (accounts['current_status'] == 'Active').to_numpy()
+        self.buckets = recency_buckets(self.days)
+        self.counts = pd.Series(np.bincount(self.buckets, minlength=len(RECENCY_LABELS) + 1),
+                                index=RECENCY_LABELS + [NO_PAYMENT_LABEL])
+        self.last_payment = pd.to_datetime(accounts['last_payment_date']).max()
+
+    def average_active_days(self) -> Optional[float]:
+        """Mean days since payment of active accounts with a payment date, None if there are none"""
+        known = self.days[self.active & ~np.isnan(self.days)]
+        return float(known.mean()) if len(known) else None
+
+    def scoring_days(self) -> float:
+        """Mean days since payment of active accounts as scored: missing dates count as MISSING_PAYMENT_DAYS"""
+        active_days = np.nan_to_num(self.days[self.active], nan=MISSING_PAYMENT_DAYS)
+        return float(active_days.mean()) if len(active_days) else float(MISSING_PAYMENT_DAYS)
+
+    def within(self, days: int) -> int:
+        """Accounts paid at most days ago"""
+        return int((self.days <= days).sum())
+
+    def beyond(self, days: int) -> int:
+        """Accounts last paid more than days ago; accounts never paid are not counted"""
+        return int((self.days > days).sum())
+
+
+def payment_recency(accounts: pd.DataFrame, today: Optional[date] = None) -> PaymentRecency:
+    """PaymentRecency of accounts, shared through the score cache while the rows and the day are unchanged"""
+    today = today or datetime.now().date()
+    key = ('recency', customer_fingerprint(accounts), today)
+    recency = score_cache.get(key)
+    if recency is None:
+        recency = PaymentRecency(accounts, today)
+        score_cache.put(key, recency)
+    return recency
+
+
+AGING_GROUPS = ['subscriber_id', 'product_type']
+
+
+def _aging_sums(rows: pd.DataFrame, today: date) -> pd.DataFrame:
+    """Accounts, delinquent accounts and overdue balance per subscriber, product and recency bucket"""
+    overdue = pd.to_numeric(rows['balance_overdue'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    labels = np.array(RECENCY_LABELS + [NO_PAYMENT_LABEL])
+    frame = pd.DataFrame({
+        'subscriber_id': rows['subscriber_id'].to_numpy(),
+        'product_type': rows['product_type'].to_numpy(),
+        'bucket': labels[recency_buckets(days_since(rows['last_payment_date'], today))],
+        'accounts': 1,
+        'delinquent_accounts': (overdue > 0).astype(int),
+        'balance_overdue': overdue,
+    })
+    return frame.groupby(AGING_GROUPS + ['bucket'], dropna=False, sort=False).sum()
+
+
+class AgingReport(MaterializedView):
+    """Overdue balances aged by days since last payment, per subscriber and product.
+
+    Holds sums per (subscriber, product, bucket), so edits add and subtract
+    the buckets of the rows they touch; buckets move with the date, so the
+    report is rebuilt each day.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        self.sums = _aging_sums(data, self.built_on)
+
+    def apply(self, change: DataChange):
+        sums = self.sums.sub(_aging_sums(change.removed, self.built_on), fill_value=0)
+        sums = sums.add(_aging_sums(change.added, self.built_on), fill_value=0)
+        # Amounts are currency, rounding stops float drift across many deltas
+        sums['balance_overdue'] = sums['balance_overdue'].round(6)
+        self.sums = sums[sums['accounts'] > 0].astype({'accounts': int, 'delinquent_accounts': int})
+
+    def is_stale(self, today: date) -> bool:
+        return today != self.built_on
+
+    def report(self, by: Sequence[str] = AGING_GROUPS) -> pd.DataFrame:
+        """Overdue balance per recency bucket with totals, one row per group of by"""
+        buckets = RECENCY_LABELS + [NO_PAYMENT_LABEL]
+        sums = self.sums.groupby(list(by) + ['bucket'], dropna=False).sum()
+        overdue = sums['balance_overdue'].unstack('bucket', fill_value=0.0).reindex(columns=buckets, fill_value=0.0)
+        totals = sums[['accounts', 'delinquent_accounts', 'balance_overdue']].groupby(level=list(by), dropna=False).sum()
+        report = overdue.join(totals)
+        report.columns.name = None
+        return report.sort_index()
@@ -0,0 +1,116 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config.scorecards import DEFAULT_SCORECARD, SCORECARDS
+
+
+class BandTable:
+    """One banded lookup compiled to sorted edge and point arrays"""
+
+    def __init__(self, edges: Sequence[float], points: Sequence, bound: str):
+        if len(points) != len(edges) + 1:
+            raise ValueError("A band table needs exactly one more points entry than edges")
+        if list(edges) != sorted(edges):
+            raise ValueError("Band edges must be sorted")
+        self.edges = np.asarray(edges, dtype=float)
+        self.points = np.asarray(points)
+        # upper bounds are inclusive (value <= edge), lower bounds too (value >= edge)
+        self.side = 'left' if bound == 'upper' else 'right'
+        self._edges = list(edges)
+        self._points = list(points)
+        self._bisect = bisect_left if self.side == 'left' else bisect_right
+
+    def band(self, values) -> np.ndarray:
+        """Band index of every value"""
+        return np.searchsorted(self.edges, values, side=self.side)
+
+    def lookup(self, values) -> np.ndarray:
+        return self.points[self.band(values)]
+
+    def lookup_one(self, value):
+        """Scalar lookup without numpy overhead, for interactive single-customer paths"""
+        return self._points[self._bisect(self._edges, value)]
+
+
+class CompiledScorecard:
+    """A scorecard version compiled once into array-based band lookups"""
+
+    def __init__(self, version: str, definition: Dict):
+        self.version = version
+        self.description = definition.get('description', '')
+        self.components = []
+        for component in definition['components']:
+            table = BandTable(component['edges'], component['points'], component['bound'])
+            self.components.append({
+                'column': component['column'],
+                'name': component['name'],
+                'feature': component['feature'],
+                'max_points': int(max(component['points'])),
+                'table': table,
+            })
+        categories = definition['categories']
+        self.categories = BandTable(categories['edges'], categories['labels'], 'lower')
+        self.max_score = sum(component['max_points'] for component in self.components)
+
+    def component(self, column: str) -> Dict:
+        for component in self.components:
+            if component['column'] == column:
+                return component
+        raise KeyError(column)
+
+    def score(self, features: pd.DataFrame) -> pd.DataFrame:
+        """Component points, total score and category for every row of features"""
+        scores = pd.DataFrame({
+            component['column']: component['table'].lookup(features[component['feature']].to_numpy())
+            for component in self.components
+        }, index=features.index)
+        scores['total_score'] = scores.sum(axis=1)
+        scores['category'] = self.categories.lookup(scores['total_score'].to_numpy())
+        return scores
+
+    def score_one(self, features: Dict) -> Dict:
+        """Points per component column plus total_score for a single feature record"""
+        points = {component['column']: component['table'].lookup_one(features[component['feature']])
+                  for component in self.components}
+        points['total_score'] = sum(points.values())
+        return points
+
+    def category(self, score) -> str:
+        return self.categories.lookup_one(score)
+
+
+@lru_cache(maxsize=None)
+def get_scorecard(version: Optional[str] = None) -> CompiledScorecard:
+    """Compile a scorecard version once per process"""
+    version = version or DEFAULT_SCORECARD
+    if version not in SCORECARDS:
+        raise KeyError(f"Unknown scorecard version: {version}")
+    return CompiledScorecard(version, SCORECARDS[version])
+
+
+def compare_scorecards(features: pd.DataFrame, versions: List[str]) -> pd.DataFrame:
+    """Evaluate several scorecard versions over the same features in one pass"""
+    columns = {}
+    for version in versions:
+        scores = get_scorecard(version).score(features)
+        columns[f'{version}_score'] = scores['total_score']
+        columns[f'{version}_category'] = scores['category']
+    comparison = pd.DataFrame(columns, index=features.index)
+    if len(versions) >= 2:
+        base, candidate = versions[0], versions[-1]
+        comparison['score_change'] = comparison[f'{candidate}_score'] - comparison[f'{base}_score']
+    return comparison
+
+
+def band_migration(comparison: pd.DataFrame, base: str, candidate: str) -> pd.DataFrame:
+    """Counts of customers moving between categories from base to candidate"""
+    labels = list(get_scorecard(base).categories.points)
+    return pd.crosstab(
+        pd.Categorical(comparison[f'{base}_category'], categories=labels),
+        pd.Categorical(comparison[f'{candidate}_category'], categories=labels),
+        rownames=[base], colnames=[candidate], dropna=False
+    )
@@ -0,0 +1,226 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import CompiledScorecard, get_scorecard
+from models.views import MaterializedView
+
+# Days assumed for an active account without a last payment date, or a customer without active accounts
+MISSING_PAYMENT_DAYS = 90
+
+
+def _as_date(today) -> np.datetime64:
+    if today is None:
+        today = datetime.now().date()
+    if isinstance(today, datetime):
+        today = today.date()
+    return np.datetime64(today, 'D')
+
+
+class EncodedAccounts:
+    """Account columns encoded once as numpy arrays, for repeated vectorized scoring.
+
+    Customers are integer codes into customer_ids and products codes into
+    product_types (-1 where missing); payment dates are day numbers with NaN
+    where missing.
+    """
+
+    def __init__(self, customer_codes, customer_ids, credit_limit, current_balance, balance_overdue,
+                 active, payment_day, product_codes, product_types):
+        self.customer_codes = customer_codes
+        self.customer_ids = customer_ids
+        self.credit_limit = credit_limit
+        self.current_balance = current_balance
+        self.balance_overdue = balance_overdue
+        self.active = active
+        self.payment_day = payment_day
+        self.product_codes = product_codes
+        self.product_types = product_types
+
+    def replace(self, **arrays) -> 'EncodedAccounts':
+        """Shallow copy with some arrays swapped, e.g. for shocked balances"""
+        encoded = EncodedAccounts(**self.__dict__)
+        encoded.__dict__.update(arrays)
+        return encoded
+
+    def partition(self, parts: int) -> List['EncodedAccounts']:
+        """Split by customer code modulo parts, renumbering customers within each part"""
+        pieces = []
+        for part in range(parts):
+            rows = self.customer_codes % parts == part
+            pieces.append(EncodedAccounts(
+                self.customer_codes[rows] // parts, self.customer_ids[part::parts],
+                self.credit_limit[rows], self.current_balance[rows], self.balance_overdue[rows],
+                self.active[rows], self.payment_day[rows], self.product_codes[rows], self.product_types
+            ))
+        return pieces
+
+
+def encode_accounts(data: pd.DataFrame) -> EncodedAccounts:
+    """Encode the scoring columns of account rows; rows without a customer are dropped"""
+    customer_codes, customer_ids = pd.factorize(data['customer_id'], sort=True)
+    valid = customer_codes >= 0
+
+    def amounts(column):
+        values = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)[valid]
+        return np.nan_to_num(values)
+
+    payment_dates = pd.to_datetime(data['last_payment_date']).to_numpy().astype('datetime64[D]')[valid]
+    payment_day = payment_dates.astype(np.int64).astype(float)
+    payment_day[np.isnat(payment_dates)] = np.nan
+    product_codes, product_types = pd.factorize(data['product_type'])
+    return EncodedAccounts(
+        customer_codes[valid], customer_ids,
+        amounts('credit_limit'), amounts('current_balance'), amounts('balance_overdue'),
+        (data['current_status'] == 'Active').to_numpy()[valid],
+        payment_day, product_codes[valid], product_types
+    )
+
+
+class EncodedPortfolio(MaterializedView):
+    """Encoded accounts of the session data, re-encoded after each edit"""
+
+    def rebuild(self, data: pd.DataFrame):
+        self.accounts = encode_accounts(data)
+
+
+def encoded_features(encoded: EncodedAccounts, today: Optional[date] = None) -> pd.DataFrame:
+    """One row of scoring inputs per customer, from encoded accounts"""
+    codes = encoded.customer_codes
+    n = len(encoded.customer_ids)
+
+    def total(values):
+        return np.bincount(codes, weights=values, minlength=n)
+
+    total_credit_limit = total(encoded.credit_limit)
+    total_current_balance = total(encoded.current_balance)
+    total_overdue = total(encoded.balance_overdue)
+
+    active = encoded.active
+    active_products = np.bincount(codes[active], minlength=n)
+
+    # Days since last payment over active accounts, missing dates count as MISSING_PAYMENT_DAYS
+    days = _as_date(today).astype(np.int64) - encoded.payment_day
+    days[np.isnan(days)] = MISSING_PAYMENT_DAYS
+    active_days = np.bincount(codes[active], weights=days[active], minlength=n)
+    avg_days_since_payment = np.full(n, float(MISSING_PAYMENT_DAYS))
+    has_active = active_products > 0
+    avg_days_since_payment[has_active] = active_days[has_active] / active_products[has_active]
+
+    # Distinct product types per customer, ignoring missing types like nunique().
+    # Product types are a small vocabulary, so a customers x types presence grid is cheap.
+    known = encoded.product_codes >= 0
+    presence = np.zeros((n, len(encoded.product_types)), dtype=bool)
+    presence[codes[known], encoded.product_codes[known]] = True
+    product_type_count = presence.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(total_credit_limit > 0, total_current_balance / total_credit_limit * 100, 0.0)
+        overdue_ratio = np.where(total_current_balance > 0, total_overdue / total_current_balance * 100, 0.0)
+
+    return pd.DataFrame({
+        'total_credit_limit': total_credit_limit,
+        'total_current_balance': total_current_balance,
+        'total_overdue': total_overdue,
+        'active_products': active_products,
+        'product_types': product_type_count,
+        'utilization': utilization,
+        'avg_days_since_payment': avg_days_since_payment,
+        'overdue_ratio': overdue_ratio,
+    }, index=pd.Index(encoded.customer_ids, name='customer_id'))
+
+
+def customer_features(data: pd.DataFrame, today: Optional[date] = None) -> pd.DataFrame:
+    """Aggregate account rows into one row of scoring inputs per customer"""
+    return encoded_features(encode_accounts(data), today)
+
+
+def _amount(value) -> float:
+    """Account amount coerced like pd.to_numeric(errors='coerce'), missing values counting as 0"""
+    if isinstance(value, bool):
+        return float(value)
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if amount != amount else amount
+
+
+def _payment_date(value) -> Optional[date]:
+    if value is None or value == '' or value != value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def record_features(accounts: List[Dict], today: Optional[date] = None) -> Dict:
+    """Scoring inputs of one customer from plain account records, matching customer_features.
+
+    Pure Python, for callers scoring one small customer at a time where a
+    DataFrame per customer would cost far more than the arithmetic.
+    """
+    today = _as_date(today).astype(date)
+    total_credit_limit = total_current_balance = total_overdue = 0.0
+    active_products = 0
+    active_days = 0.0
+    product_types = set()
+    for account in accounts:
+        total_credit_limit += _amount(account.get('credit_limit'))
+        total_current_balance += _amount(account.get('current_balance'))
+        total_overdue += _amount(account.get('balance_overdue'))
+        product_type = account.get('product_type')
+        if product_type is not None and product_type == product_type:
+            product_types.add(product_type)
+        if account.get('current_status') == 'Active':
+            active_products += 1
+            paid = _payment_date(account.get('last_payment_date'))
+            active_days += (today - paid).days if paid is not None else MISSING_PAYMENT_DAYS
+
+    return {
+        'total_credit_limit': total_credit_limit,
+        'total_current_balance': total_current_balance,
+        'total_overdue': total_overdue,
+        'active_products': active_products,
+        'product_types': len(product_types),
+        'utilization': total_current_balance / total_credit_limit * 100 if total_credit_limit > 0 else 0.0,
+        'avg_days_since_payment': active_days / active_products if active_products else float(MISSING_PAYMENT_DAYS),
+        'overdue_ratio': total_overdue / total_current_balance * 100 if total_current_balance > 0 else 0.0,
+    }
+
+
+def score_features(features: pd.DataFrame, scorecard: Optional[CompiledScorecard] = None) -> pd.DataFrame:
+    """Band every customer's features into component points, a total score and a category"""
+    return (scorecard or get_scorecard()).score(features)
+
+
+def score_portfolio(data: pd.DataFrame, today: Optional[date] = None,
+                    scorecard: Optional[CompiledScorecard] = None) -> pd.DataFrame:
+    """Score every customer in data in one vectorized pass"""
+    features = customer_features(data, today)
+    return features.join(score_features(features, scorecard))
+
+
+def score_breakdown(scores: pd.Series, scorecard: Optional[CompiledScorecard] = None) -> Tuple[int, List[Dict]]:
+    """Turn one row of score_portfolio output into (total, components) like _calculate_credit_score"""
+    descriptions = {
+        'utilization': f"Utilization: {scores['utilization']:.1f}%",
+        'avg_days_since_payment': f"Avg days since payment: {scores['avg_days_since_payment']:.0f}",
+        'product_types': f"Product types: {int(scores['product_types'])}",
+        'active_products': f"Active accounts: {int(scores['active_products'])}",
+        'overdue_ratio': f"Overdue ratio: {scores['overdue_ratio']:.1f}%",
+    }
+    components = [
+        {
+            "name": component['name'],
+            "points": int(scores[component['column']]),
+            "max_points": component['max_points'],
+            "description": descriptions[component['feature']]
+        }
+        for component in (scorecard or get_scorecard()).components
+    ]
+    return sum(component["points"] for component in components), components
@@ -0,0 +1,50 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import CompiledScorecard, get_scorecard
+
+# Plausible values of each scoring feature, the default axes of a sensitivity grid
+FEATURE_RANGES = {
+    'utilization': np.arange(0, 101, 5),
+    'avg_days_since_payment': np.arange(0, 91, 5),
+    'overdue_ratio': np.arange(0, 31, 2.5),
+    'product_types': np.arange(1, 7),
+    'active_products': np.arange(1, 7),
+}
+
+FEATURE_LABELS = {
+    'utilization': "Utilization (%)",
+    'avg_days_since_payment': "Avg days since payment",
+    'overdue_ratio': "Overdue ratio (%)",
+    'product_types': "Product types",
+    'active_products': "Active accounts",
+}
+
+
+def sensitivity_grid(features: Dict, x: str = 'utilization', y: str = 'avg_days_since_payment',
+                     x_values: Optional[Sequence[float]] = None, y_values: Optional[Sequence[float]] = None,
+                     scorecard: Optional[CompiledScorecard] = None) -> pd.DataFrame:
+    """Total score for every (y, x) combination of two features, the others held at the customer's values.
+
+    The whole grid is scored at once: components on the two axes are band
+    lookups over the grid arrays, the rest add a constant.
+    """
+    if x == y:
+        raise ValueError("A sensitivity grid needs two different features")
+    scorecard = scorecard or get_scorecard()
+    x_values = np.asarray(FEATURE_RANGES[x] if x_values is None else x_values, dtype=float)
+    y_values = np.asarray(FEATURE_RANGES[y] if y_values is None else y_values, dtype=float)
+    grid_x, grid_y = np.meshgrid(x_values, y_values)
+
+    scores = np.zeros(grid_x.shape, dtype=int)
+    for component in scorecard.components:
+        feature = component['feature']
+        if feature == x:
+            scores += component['table'].lookup(grid_x)
+        elif feature == y:
+            scores += component['table'].lookup(grid_y)
+        else:
+            scores += component['table'].lookup_one(features[feature])
+    return pd.DataFrame(scores, index=pd.Index(y_values, name=y), columns=pd.Index(x_values, name=x))
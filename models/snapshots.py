@@ -0,0 +1,95 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.scorecard import get_scorecard
+from models.scoring import score_portfolio
+from models.store import DATA_DIR, SharedStore, atomic_write
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshots')
+
+
+class SnapshotMismatch(RuntimeError):
+    """A snapshot date was started against another store version, shard count or scorecard"""
+
+
+def shard_of(customer_ids: pd.Series, shards: int) -> np.ndarray:
+    """Stable shard number per customer, identical across processes and runs"""
+    hashes = pd.util.hash_pandas_object(customer_ids, index=False).to_numpy()
+    return (hashes % np.uint64(shards)).astype(np.int64)
+
+
+def _shard_path(snapshot_dir: str, shard: int) -> str:
+    return os.path.join(snapshot_dir, f'shard-{shard:04d}.pkl')
+
+
+def score_shard(shard: int, accounts: pd.DataFrame, snapshot_date: date,
+                scorecard_version: str, snapshot_dir: str):
+    """Worker entry point: score one shard and write it next to the others"""
+    scores = score_portfolio(accounts, today=snapshot_date, scorecard=get_scorecard(scorecard_version))
+    scores['snapshot_date'] = pd.Timestamp(snapshot_date)
+    scores['scorecard'] = scorecard_version
+    atomic_write(_shard_path(snapshot_dir, shard), lambda f: scores.to_pickle(f), mode='wb')
+    return shard, len(scores)
+
+
+def run_snapshot(snapshot_date: date, workers: Optional[int] = None, shards: int = 64,
+                 scorecard_version: Optional[str] = None, output_dir: str = SNAPSHOT_DIR,
+                 store: Optional[SharedStore] = None, restart: bool = False,
+                 progress: Optional[Callable[[int, int, int, int], None]] = None) -> pd.DataFrame:
+    """Score the whole store across worker processes and write a dated snapshot.
+
+    Shards already written by an interrupted run for the same store version are
+    skipped, so rerunning the same command resumes where it stopped.
+    """
+    store = store or SharedStore()
+    if not store.exists():
+        raise RuntimeError(f"The shared store {store.path} is empty; start the app once to seed it")
+    scorecard_version = scorecard_version or get_scorecard().version
+    snapshot_dir = os.path.join(output_dir, snapshot_date.isoformat())
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    data, store_version = store.load()
+    run = {'store_version': store_version, 'shards': shards, 'scorecard': scorecard_version}
+    run_path = os.path.join(snapshot_dir, 'run.json')
+    if os.path.exists(run_path) and not restart:
+        with open(run_path) as f:
+            previous = json.load(f)
+        if previous != run:
+            raise SnapshotMismatch(f"Snapshot {snapshot_date} was started with {previous}, now {run}")
+    else:
+        for name in os.listdir(snapshot_dir):
+            if name.startswith('shard-'):
+                os.remove(os.path.join(snapshot_dir, name))
+        atomic_write(run_path, lambda f: json.dump(run, f))
+
+    shard_numbers = shard_of(data['customer_id'], shards)
+    pending = [shard for shard in range(shards) if not os.path.exists(_shard_path(snapshot_dir, shard))]
+    done = shards - len(pending)
+    if progress:
+        progress(done, shards, -1, 0)
+
+    if pending:
+        groups = dict(tuple(data.groupby(shard_numbers, sort=False)))
+        empty = data.iloc[0:0]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(score_shard, shard, groups.get(shard, empty), snapshot_date,
+                            scorecard_version, snapshot_dir)
+                for shard in pending
+            ]
+            for future in as_completed(futures):
+                shard, customers = future.result()
+                done += 1
+                if progress:
+                    progress(done, shards, shard, customers)
+
+    snapshot = pd.concat([pd.read_pickle(_shard_path(snapshot_dir, shard)) for shard in range(shards)])
+    snapshot = snapshot.sort_index()
+    atomic_write(os.path.join(snapshot_dir, 'scores.pkl'), lambda f: snapshot.to_pickle(f), mode='wb')
+    return snapshot
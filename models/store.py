@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Directory shared by every replica on the host
+DATA_DIR = os.environ.get('CREDIT_BOOST_DATA_DIR', 'data')
+# Column identifying an account row across replicas
+ROW_KEY = 'account_number'
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Hold an exclusive inter-process lock on lock_path"""
+    directory = os.path.dirname(lock_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(lock_path, 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path: str, write: Callable, mode: str = 'w'):
+    """Write a file through a temp file so readers never see a partial write"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class VersionTable:
+    """File-based table of version counters, one per cache namespace"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._versions: Dict[str, int] = {}
+
+    def read(self) -> Dict[str, int]:
+        """Return the current versions, re-reading the file only when it changed"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    with open(self.path, 'r') as f:
+                        self._versions = json.load(f)
+                    self._stamp = stamp
+                except (OSError, ValueError):
+                    pass
+            return dict(self._versions)
+
+    def get(self, namespace: str) -> int:
+        """Current version of a single namespace"""
+        return self.read().get(namespace, 0)
+
+    def bump(self, namespaces: Iterable[str]) -> Dict[str, int]:
+        """Increment the given namespaces and return the new versions"""
+        with file_lock(self.path + '.lock'):
+            versions = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    versions = json.load(f)
+            for namespace in set(namespaces):
+                versions[namespace] = versions.get(namespace, 0) + 1
+            atomic_write(self.path, lambda f: json.dump(versions, f))
+        return versions
+
+
+class InvalidationChannel:
+    """Tells this process which local caches to drop after another replica writes"""
+
+    def __init__(self, versions: VersionTable):
+        self.versions = versions
+        self._lock = threading.Lock()
+        self._seen = versions.read()
+        self._subscribers: List[Tuple[str, Callable]] = []
+
+    def subscribe(self, prefix: str, callback: Callable):
+        """Call callback(namespace) whenever a namespace starting with prefix changes"""
+        with self._lock:
+            self._subscribers.append((prefix, callback))
+
+    def publish(self, namespaces: Iterable[str]) -> Dict[str, int]:
+        """Bump namespaces for the other replicas; the caller drops its own caches"""
+        namespaces = set(namespaces)
+        versions = self.versions.bump(namespaces)
+        with self._lock:
+            # Only this call's bumps are seen; other replicas' are left for poll() to deliver
+            self._seen.update({ns: versions[ns] for ns in namespaces})
+        return versions
+
+    def poll(self) -> List[str]:
+        """Drop the caches of every namespace changed since the last poll"""
+        current = self.versions.read()
+        with self._lock:
+            changed = [ns for ns, version in current.items() if self._seen.get(ns) != version]
+            self._seen.update(current)
+            subscribers = list(self._subscribers)
+        for namespace in changed:
+            for prefix, callback in subscribers:
+                if namespace.startswith(prefix):
+                    callback(namespace)
+        return changed
+
+
+_channel = None
+_channel_lock = threading.Lock()
+
+
+def get_channel() -> InvalidationChannel:
+    """Process-wide invalidation channel"""
+    global _channel
+    with _channel_lock:
+        if _channel is None:
+            _channel = InvalidationChannel(VersionTable(os.path.join(DATA_DIR, 'versions.json')))
+        return _channel
+
+
+def subscriber_namespaces(data: pd.DataFrame) -> List[str]:
+    """Version namespaces of the subscriber partitions present in data"""
+    if 'subscriber_id' not in data.columns:
+        return []
+    return [f'subscriber:{sub_id}' for sub_id in data['subscriber_id'].dropna().unique()]
+
+
+class SharedStore:
+    """Portfolio store on local disk, shared by every app replica on the host"""
+
+    NAMESPACE = 'portfolio'
+
+    def __init__(self, data_dir: str = DATA_DIR, channel: Optional[InvalidationChannel] = None):
+        self.path = os.path.join(data_dir, 'portfolio.pkl')
+        self.channel = channel or get_channel()
+        self._lock = threading.Lock()
+        self._cached: Optional[Tuple[int, pd.DataFrame]] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def version(self) -> int:
+        """Version of the last published portfolio"""
+        return self.channel.versions.get(self.NAMESPACE)
+
+    def load(self) -> Tuple[pd.DataFrame, int]:
+        """Load the portfolio; replicas unpickle once per version, not per session"""
+        version = self.version()
+        with self._lock:
+            if self._cached is None or self._cached[0] != version:
+                self._cached = (version, pd.read_pickle(self.path))
+            return self._cached[1].copy(), version
+
+    def seed(self, data: pd.DataFrame) -> int:
+        """Create the store from data unless another replica already did"""
+        with file_lock(self.path + '.lock'):
+            if not self.exists():
+                atomic_write(self.path, lambda f: data.to_pickle(f), mode='wb')
+                return self.channel.publish([self.NAMESPACE] + subscriber_namespaces(data))[self.NAMESPACE]
+        return self.version()
+
+    def merge_rows(self, removed: Optional[pd.DataFrame] = None, added: Optional[pd.DataFrame] = None) -> int:
+        """Apply one edit to the stored portfolio: drop the removed rows, then append the added ones.
+
+        Rows are matched on ROW_KEY in the file as it stands under the lock, so
+        replicas editing the same partition only overwrite each other on the
+        accounts they both changed.
+        """
+        edits = [rows for rows in (removed, added) if rows is not None and not rows.empty]
+        with file_lock(self.path + '.lock'):
+            data = pd.read_pickle(self.path)
+            if removed is not None and not removed.empty:
+                data = data[~data[ROW_KEY].isin(removed[ROW_KEY])]
+            if added is not None and not added.empty:
+                data = pd.concat([data, added], ignore_index=True)
+            data = data.reset_index(drop=True)
+            atomic_write(self.path, lambda f: data.to_pickle(f), mode='wb')
+            touched = subscriber_namespaces(pd.concat(edits)) if edits else []
+            versions = self.channel.publish([self.NAMESPACE] + touched)
+        with self._lock:
+            self._cached = (versions[self.NAMESPACE], data)
+        return versions[self.NAMESPACE]
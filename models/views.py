@@ -0,0 +1,37 @@
+from datetime import date, datetime
+from typing import List, Optional
+
+import pandas as pd
+
+
+class DataChange:
+    """Rows removed from and added to the session data by a single edit"""
+
+    def __init__(self, removed: Optional[pd.DataFrame], added: Optional[pd.DataFrame], data: pd.DataFrame):
+        self.removed = removed if removed is not None else data.iloc[0:0]
+        self.added = added if added is not None else data.iloc[0:0]
+        self.data = data  # session data after the change
+
+    @property
+    def customer_ids(self) -> List[str]:
+        ids = pd.concat([self.removed['customer_id'], self.added['customer_id']])
+        return ids.dropna().unique().tolist()
+
+
+class MaterializedView:
+    """Structure derived from the session data and kept in step with it by deltas"""
+
+    def __init__(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        self.rebuild(data)
+
+    def rebuild(self, data: pd.DataFrame):
+        raise NotImplementedError
+
+    def apply(self, change: DataChange):
+        """Fold a change into the view; views without deltas rebuild from scratch"""
+        self.rebuild(change.data)
+
+    def is_stale(self, today: date) -> bool:
+        """Whether the view must be rebuilt, e.g. because it depends on the date"""
+        return False
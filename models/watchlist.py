@@ -0,0 +1,120 @@
+import heapq
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.scoring import customer_features
+from models.views import DataChange, MaterializedView
+
+# A customer is watched once any of these customer features exceeds its threshold
+RISK_THRESHOLDS = {
+    'total_overdue': 1000.0,  # rand
+    'utilization': 90.0,  # percent
+    'avg_days_since_payment': 60.0,  # days, active accounts
+}
+RISK_LABELS = {
+    'total_overdue': "Overdue balance",
+    'utilization': "Utilization",
+    'avg_days_since_payment': "Days since payment",
+}
+
+
+def risk_values(features: pd.DataFrame) -> pd.DataFrame:
+    """The thresholded features, with NaN days since payment for customers without active accounts.
+
+    customer_features imputes MISSING_PAYMENT_DAYS for those customers, which
+    would breach the recency threshold although nothing is being paid late.
+    """
+    values = features[list(RISK_THRESHOLDS)].astype(float)
+    values.loc[features['active_products'] == 0, 'avg_days_since_payment'] = np.nan
+    return values
+
+
+def risk_severity(features: pd.DataFrame) -> pd.DataFrame:
+    """Severity and breached thresholds of every customer in features.
+
+    Severity adds up how many times each breached threshold is exceeded, so
+    a customer far over one limit or over several ranks first; customers
+    breaching nothing get 0. Missing values breach nothing.
+    """
+    values = risk_values(features).to_numpy()
+    thresholds = np.array(list(RISK_THRESHOLDS.values()))
+    breached = values > thresholds
+    severity = np.where(breached, values / thresholds, 0.0).sum(axis=1)
+    labels = list(RISK_LABELS.values())
+    breaches = [', '.join(label for label, hit in zip(labels, row) if hit) for row in breached]
+    return pd.DataFrame({'severity': severity, 'breaches': breaches}, index=features.index)
+
+
+class RiskWatchlist(MaterializedView):
+    """Customers over a risk threshold, in a max-heap by severity.
+
+    Edits re-evaluate only the customers they touch: a changed customer gets
+    a new heap entry and its old one is left behind as stale, to be dropped
+    when it surfaces. Reading the top n pops about n entries instead of
+    scanning the portfolio. Days since payment move with the date, so the
+    list is rebuilt each day.
+    """
+
+    def rebuild(self, data: pd.DataFrame):
+        self.built_on = datetime.now().date()
+        self.entries: Dict[str, Dict] = {}  # customer_id -> current watchlist record
+        self.heap: List[Tuple[float, str, int]] = []  # (-severity, customer_id, revision)
+        self.revision = 0
+        self._evaluate(data, [])
+        self._compact()
+
+    def _evaluate(self, rows: pd.DataFrame, customer_ids) -> List[Tuple[float, str, int]]:
+        """Replace the records of customer_ids by those of rows, returning the new heap entries"""
+        self.revision += 1
+        for customer_id in customer_ids:
+            self.entries.pop(customer_id, None)
+        if rows.empty:
+            return []
+        features = customer_features(rows, self.built_on)
+        risk = risk_severity(features).join(risk_values(features))
+        flagged = risk[risk['severity'] > 0]
+        entries = []
+        for customer_id, record in zip(flagged.index, flagged.to_dict('records')):
+            record['revision'] = self.revision
+            self.entries[customer_id] = record
+            entries.append((-record['severity'], customer_id, self.revision))
+        return entries
+
+    def _compact(self):
+        """Rebuild the heap from the current records, dropping stale entries"""
+        self.heap = [(-record['severity'], customer_id, record['revision'])
+                     for customer_id, record in self.entries.items()]
+        heapq.heapify(self.heap)
+
+    def apply(self, change: DataChange):
+        customer_ids = change.customer_ids
+        for entry in self._evaluate(change.data[change.data['customer_id'].isin(customer_ids)], customer_ids):
+            heapq.heappush(self.heap, entry)
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self._compact()
+
+    def is_stale(self, today: date) -> bool:
+        return today != self.built_on
+
+    def _is_current(self, entry: Tuple[float, str, int]) -> bool:
+        record = self.entries.get(entry[1])
+        return record is not None and record['revision'] == entry[2]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def top(self, n: int = 20) -> pd.DataFrame:
+        """The n most severe customers, most severe first"""
+        found = []
+        while self.heap and len(found) < n:
+            entry = heapq.heappop(self.heap)
+            if self._is_current(entry):
+                found.append(entry)
+        for entry in found:
+            heapq.heappush(self.heap, entry)
+        return pd.DataFrame([dict(self.entries[customer_id], customer_id=customer_id)
+                             for _, customer_id, _ in found],
+                            columns=['customer_id', 'severity', 'breaches'] + list(RISK_THRESHOLDS))
@@ -0,0 +1,146 @@
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from models.scorecard import CompiledScorecard, get_scorecard
+from models.scoring import MISSING_PAYMENT_DAYS
+
+
+class WhatIfOverlay:
+    """Hypothetical account edits layered over one customer's accounts.
+
+    The customer's rows are read once into per-account values and running
+    totals. Each edit folds only the difference it makes to the totals, so
+    rescoring costs a handful of additions and one scorecard lookup, and the
+    real data is never copied or touched.
+    """
+
+    def __init__(self, accounts: pd.DataFrame, today: Optional[date] = None,
+                 scorecard: Optional[CompiledScorecard] = None):
+        self.scorecard = scorecard or get_scorecard()
+        today = pd.Timestamp(today or datetime.now().date())
+
+        def amounts(column):
+            return pd.to_numeric(accounts[column], errors='coerce').fillna(0)
+
+        payment_days = (today - pd.to_datetime(accounts['last_payment_date'])).dt.days.fillna(MISSING_PAYMENT_DAYS)
+        self.accounts = {}
+        for key, product_type, credit_limit, balance, overdue, status, days in zip(
+                accounts.index, accounts['product_type'], amounts('credit_limit'), amounts('current_balance'),
+                amounts('balance_overdue'), accounts['current_status'], payment_days):
+            self.accounts[key] = {
+                'product_type': product_type if pd.notna(product_type) else None,
+                'credit_limit': float(credit_limit),
+                'current_balance': float(balance),
+                'balance_overdue': float(overdue),
+                'active': status == 'Active',
+                'days_since_payment': float(days),
+            }
+
+        self.totals = {'credit_limit': 0.0, 'current_balance': 0.0, 'balance_overdue': 0.0,
+                       'active_products': 0, 'active_days': 0.0}
+        self.product_types = Counter()
+        for account in self.accounts.values():
+            self._fold(account, 1)
+        self.base = self.score()
+
+        self.paydowns = {}  # account key -> rands paid off, overdue first
+        self.closed = set()  # account keys closed
+        self.added = []  # hypothetical new products
+
+    def _fold(self, account: Dict, sign: int):
+        """Add (sign=1) or remove (sign=-1) one account's contribution to the totals"""
+        # Amounts are currency, rounding stops float drift across many edits
+        for column in ('credit_limit', 'current_balance', 'balance_overdue'):
+            self.totals[column] = round(self.totals[column] + sign * account[column], 6)
+        if account['active']:
+            self.totals['active_products'] += sign
+            self.totals['active_days'] += sign * account['days_since_payment']
+        if account['product_type'] is not None:
+            self.product_types[account['product_type']] += sign
+            if self.product_types[account['product_type']] <= 0:
+                del self.product_types[account['product_type']]
+
+    def _edited(self, key) -> Dict:
+        """An existing account as it looks with its paydown and closure applied"""
+        account = dict(self.accounts[key])
+        paid = min(self.paydowns.get(key, 0.0), account['current_balance'])
+        account['current_balance'] -= paid
+        account['balance_overdue'] = max(account['balance_overdue'] - paid, 0.0)
+        if key in self.closed:
+            account['active'] = False
+        return account
+
+    def _update(self, key, change):
+        self._fold(self._edited(key), -1)
+        change()
+        self._fold(self._edited(key), 1)
+
+    def pay_down(self, key, amount: float):
+        """Pay amount off one account, replacing any earlier paydown of it"""
+        self._update(key, lambda: self.paydowns.__setitem__(key, max(float(amount), 0.0)))
+
+    def close(self, key, closed: bool = True):
+        if closed:
+            self._update(key, lambda: self.closed.add(key))
+        else:
+            self._update(key, lambda: self.closed.discard(key))
+
+    def add_product(self, product_type: str, credit_limit: float = 0.0, current_balance: float = 0.0) -> int:
+        """Open a hypothetical active product, paid today; returns its position in added"""
+        account = {
+            'product_type': product_type,
+            'credit_limit': float(credit_limit),
+            'current_balance': float(current_balance),
+            'balance_overdue': 0.0,
+            'active': True,
+            'days_since_payment': 0.0,
+        }
+        self.added.append(account)
+        self._fold(account, 1)
+        return len(self.added) - 1
+
+    def remove_product(self, position: int):
+        self._fold(self.added.pop(position), -1)
+
+    def reset(self):
+        """Drop every hypothetical edit"""
+        for key in list(self.paydowns):
+            self.pay_down(key, 0.0)
+        for key in list(self.closed):
+            self.close(key, False)
+        while self.added:
+            self.remove_product(len(self.added) - 1)
+        self.paydowns.clear()
+
+    def features(self) -> Dict:
+        """Scoring features of the overlaid accounts, from the running totals"""
+        totals = self.totals
+        credit_limit, balance = totals['credit_limit'], totals['current_balance']
+        active = totals['active_products']
+        return {
+            'utilization': balance / credit_limit * 100 if credit_limit > 0 else 0,
+            'overdue_ratio': totals['balance_overdue'] / balance * 100 if balance > 0 else 0,
+            'avg_days_since_payment': totals['active_days'] / active if active > 0 else MISSING_PAYMENT_DAYS,
+            'product_types': len(self.product_types),
+            'active_products': active,
+        }
+
+    def score(self) -> Dict:
+        """Points per component column plus total_score under the current edits"""
+        return self.scorecard.score_one(self.features())
+
+    def changes(self) -> List[Dict]:
+        """Per-component points before and after the edits"""
+        after = self.score()
+        return [
+            {
+                'name': component['name'],
+                'current_points': self.base[component['column']],
+                'simulated_points': after[component['column']],
+                'max_points': component['max_points'],
+            }
+            for component in self.scorecard.components
+        ]
@@ -0,0 +1,77 @@
+"""Headless portfolio rescoring for nightly score snapshots.
+
+Usage:
+    python rescore.py [--date YYYY-MM-DD] [--workers N] [--shards 64] [--scorecard v1] [--restart] [--no-history]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from models.history import ScoreHistory
+from models.scorecard import get_scorecard
+from models.snapshots import SNAPSHOT_DIR, SnapshotMismatch, run_snapshot
+from models.store import SharedStore
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score every customer in the shared store and write a dated snapshot")
+    parser.add_argument('--date', type=date.fromisoformat, default=datetime.now().date(),
+                        help="snapshot date, also used as 'today' for payment recency (default: today)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument('--shards', type=int, default=64,
+                        help="customer hash shards; each is scored and saved independently (default: 64)")
+    parser.add_argument('--scorecard', default=None, help="scorecard version (default: the active one)")
+    parser.add_argument('--output-dir', default=SNAPSHOT_DIR, help="snapshot root directory")
+    parser.add_argument('--restart', action='store_true',
+                        help="discard shards from an earlier run of the same date instead of resuming, "
+                             "and replace that date in the score history")
+    parser.add_argument('--no-history', action='store_true',
+                        help="do not append the snapshot to the score history")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    store = SharedStore()
+    if not store.exists():
+        sys.exit("The shared store is empty; start the app once to seed it")
+    started = time.time()
+
+    def report(done, total, shard, customers):
+        if shard < 0:
+            print(f"{done}/{total} shards already scored, resuming", file=sys.stderr)
+        else:
+            print(f"[{done}/{total}] shard {shard:04d}: {customers} customers "
+                  f"({time.time() - started:.1f}s)", file=sys.stderr)
+
+    try:
+        snapshot = run_snapshot(
+            args.date,
+            workers=args.workers,
+            shards=args.shards,
+            scorecard_version=args.scorecard,
+            output_dir=args.output_dir,
+            store=store,
+            restart=args.restart,
+            progress=report
+        )
+    except SnapshotMismatch as error:
+        sys.exit(f"{error}\nRerun with --restart to rescore {args.date} from scratch")
+    print(f"Scored {len(snapshot)} customers for {args.date} in {time.time() - started:.1f}s", file=sys.stderr)
+
+    # Only the active scorecard feeds the customer-facing history; a restarted run replaces its date
+    if not args.no_history and args.scorecard in (None, get_scorecard().version):
+        history = ScoreHistory()
+        replacing = args.restart and args.date in history.snapshot_dates()
+        if history.append(args.date, snapshot, replace=args.restart):
+            action = "Replaced" if replacing else "Appended"
+            print(f"{action} {args.date} in the score history", file=sys.stderr)
+        else:
+            print(f"Score history already has {args.date}, left unchanged", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Streaming scorer: NDJSON account records in, one NDJSON score per customer out.
+
+Usage:
+    python score_stream.py [--date YYYY-MM-DD] [--scorecard v1] [--components] < accounts.ndjson > scores.ndjson
+
+Input records must arrive grouped by customer_id (e.g. sorted). Each group is
+scored as soon as the next customer starts, so memory holds one customer's
+accounts at a time and the command can sit in a pipeline over inputs of any
+size. A customer whose records cannot be scored yields {"customer_id", "error"}
+and the stream carries on.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+from itertools import groupby
+
+from models.scorecard import get_scorecard
+from models.scoring import record_features
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score NDJSON account records from stdin, one customer at a time")
+    parser.add_argument('--date', type=date.fromisoformat, default=datetime.now().date(),
+                        help="'today' for payment recency (default: today)")
+    parser.add_argument('--scorecard', default=None, help="scorecard version (default: the active one)")
+    parser.add_argument('--components', action='store_true',
+                        help="include the scoring features and points per component")
+    return parser.parse_args(argv)
+
+
+def _records(lines, errors):
+    """Parsed records; malformed lines are reported and skipped"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            print(f"line {number}: invalid JSON ({error})", file=errors)
+            continue
+        if not isinstance(record, dict) or 'customer_id' not in record:
+            print(f"line {number}: record without customer_id", file=errors)
+            continue
+        yield record
+
+
+def score_stream(lines, output, today: date, scorecard_version=None, components=False, errors=sys.stderr) -> int:
+    """Score each run of records sharing a customer_id and write one result line per run"""
+    scorecard = get_scorecard(scorecard_version)
+    customers = 0
+    for customer_id, accounts in groupby(_records(lines, errors), key=lambda record: record['customer_id']):
+        accounts = list(accounts)
+        try:
+            features = record_features(accounts, today)
+            points = scorecard.score_one(features)
+        except (TypeError, ValueError) as error:
+            result = {'customer_id': customer_id, 'error': str(error)}
+        else:
+            result = {
+                'customer_id': customer_id,
+                'score': points['total_score'],
+                'category': scorecard.category(points['total_score']),
+                'accounts': len(accounts),
+                'scorecard': scorecard.version,
+                'as_of': today.isoformat(),
+            }
+            if components:
+                result['features'] = features
+                result['points'] = {column: value for column, value in points.items() if column != 'total_score'}
+        output.write(json.dumps(result, default=int) + '\n')
+        customers += 1
+    return customers
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    try:
+        customers = score_stream(sys.stdin, sys.stdout, args.date, args.scorecard, args.components)
+    except BrokenPipeError:
+        # Downstream stopped reading, e.g. `| head`; keep the interpreter from failing on the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    print(f"Scored {customers} customers", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""HTTP scoring service for programmatic clients such as the loan-origination system.
+
+Usage:
+    python serve.py [--host 127.0.0.1] [--port 8080] [--keys api_keys.json]
+    python serve.py --create-key NAME --subscribers SUB001,SUB002
+    python serve.py --revoke-key NAME
+"""
+import argparse
+import asyncio
+import sys
+
+from api.server import ScoringService, serve
+from auth.api_keys import ApiKeyDatabase
+from models.store import SharedStore
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve customer scores and profiles over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="interface to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument('--keys', default='api_keys.json', help="API key file (default: api_keys.json)")
+    parser.add_argument('--create-key', metavar='NAME', help="issue a key for a client and print it")
+    parser.add_argument('--subscribers', default='',
+                        help="comma-separated subscriber IDs the new client may access")
+    parser.add_argument('--revoke-key', metavar='NAME', help="revoke a client's key")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    keys = ApiKeyDatabase(args.keys)
+
+    if args.create_key:
+        subscriber_ids = [s.strip() for s in args.subscribers.split(',') if s.strip()]
+        if not subscriber_ids:
+            sys.exit("--create-key needs --subscribers")
+        print(keys.create_key(args.create_key, subscriber_ids))
+        print(f"Key for {args.create_key} ({', '.join(subscriber_ids)}); it is not stored and will not be shown again",
+              file=sys.stderr)
+        return
+    if args.revoke_key:
+        if not keys.revoke(args.revoke_key):
+            sys.exit(f"No client named {args.revoke_key}")
+        print(f"Revoked the key of {args.revoke_key}", file=sys.stderr)
+        return
+
+    store = SharedStore()
+    if not store.exists():
+        sys.exit("The shared store is empty; start the app once to seed it")
+    try:
+        asyncio.run(serve(ScoringService(store, keys), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()